@@ -58,7 +58,23 @@ INITIAL GAME STATE CREATION
     ? symbol filled for all potential actions
     All game states are squares of varying sizes
 """
+import argparse
+import csv
+import gc
+import itertools
+import json
 import math
+import mmap
+import os
+import platform
+import random
+import shutil
+import struct
+import sys
+import time
+from collections import OrderedDict, namedtuple
+from math import inf, nextafter
+from random import randint
 
 
 def make_list_rep(size):
@@ -89,38 +105,173 @@ def make_list_rep(size):
     return environment
 
 
+"""
+Board Geometry
+
+Which moves belong to which box only depends on the size of the board, so it is worked out once per size.
+box_edges[b] holds the 4 move indices of box b (boxes numbered row by row, top left box first)
+and edge_boxes[i] holds the 1 or 2 box numbers that the move at index i touches.
+Finding the boxes a move affects is then a lookup instead of a search through every box.
+
+The masks are the same tables for the bitboard representation (bit i = index i of make_list_rep).
+The Zobrist keys are random numbers XORed together to hash a position (see SearchState.key),
+they come from a fixed seed so every run and every process hashes the same position the same way.
+
+A square board has 8 symmetries (4 rotations, each one also mirrored). symmetries[s][i] is the index that
+index i moves to under symmetry s (0 is the identity), inverse_symmetries[s] moves it back.
+zobrist_symmetric[i] packs the key of where index i goes under all 8 symmetries into one integer
+(64 bits each), so one XOR keeps the hash of all 8 mirrored/rotated boards up to date.
+"""
+
+ZOBRIST_BITS = 64
+ZOBRIST_MASK = (1 << ZOBRIST_BITS) - 1
+
+
+class BoardGeometry:
+
+    def __init__(self, size):
+        self.size = size
+        self.line_length = size * 2 + 1
+        self.cells = self.line_length ** 2  # length of make_list_rep(size)
+        self.boxes = size ** 2
+
+        box_edges = []
+        line_length = self.line_length
+        for row in range(0, size):
+            for column in range(0, size):
+                corner = row * 2 * line_length + column * 2  # top left vertex is origin for each box
+                box_edges.append((corner + 1,  # top
+                                  corner + line_length,  # left
+                                  corner + line_length + 2,  # right
+                                  corner + 2 * line_length + 1))  # bottom
+        self.box_edges = tuple(box_edges)
+
+        edge_boxes = [() for cell in range(self.cells)]
+        for box, edges in enumerate(self.box_edges):
+            for move in edges:
+                edge_boxes[move] += (box,)
+        self.edge_boxes = edge_boxes
+        self.moves = tuple(move for move in range(self.cells) if edge_boxes[move])
+
+        # bitboard versions
+        self.all_moves = 0
+        for move in self.moves:
+            self.all_moves |= 1 << move
+        self.box_masks = tuple(sum(1 << move for move in edges) for edges in self.box_edges)
+        # for every index, (box bit, box mask) of the boxes it touches
+        self.edge_box_masks = [tuple((1 << box, self.box_masks[box]) for box in boxes) for boxes in edge_boxes]
+
+        keys = random.Random(size)
+        self.zobrist_moves = [keys.getrandbits(64) for cell in range(self.cells)]
+        self.zobrist_max_to_move = keys.getrandbits(64)
+        self.zobrist_again = keys.getrandbits(64)
+        self.zobrist_score = [keys.getrandbits(64) for diff in range(2 * self.boxes + 1)]  # max score - min score + boxes
+
+        last = line_length - 1
+        transforms = (lambda r, c: (r, c), lambda r, c: (c, last - r),  # identity, rotate 90
+                      lambda r, c: (last - r, last - c), lambda r, c: (last - c, r),  # rotate 180, rotate 270
+                      lambda r, c: (r, last - c), lambda r, c: (last - r, c),  # mirror left/right, mirror top/bottom
+                      lambda r, c: (c, r), lambda r, c: (last - c, last - r))  # mirror on both diagonals
+        self.symmetries = []
+        self.inverse_symmetries = []
+        for transform in transforms:
+            permutation = [0] * self.cells
+            inverse = [0] * self.cells
+            for index in range(self.cells):
+                row, column = transform(index // line_length, index % line_length)
+                permutation[index] = row * line_length + column
+                inverse[row * line_length + column] = index
+            self.symmetries.append(permutation)
+            self.inverse_symmetries.append(inverse)
+        self.zobrist_symmetric = [sum(self.zobrist_moves[permutation[index]] << (ZOBRIST_BITS * number)
+                                      for number, permutation in enumerate(self.symmetries))
+                                  for index in range(self.cells)]
+
+
+#geometry for each size, and for each list length (with and without the turn again 'A')
+_geometries = dict()
+_geometries_by_length = dict()
+
+
+def board_geometry(size):
+    if size not in _geometries:
+        _geometries[size] = BoardGeometry(size)
+    return _geometries[size]
+
+
+def geometry_of(list_rep):
+    geometry = _geometries_by_length.get(len(list_rep))
+    if geometry is None:
+        geometry = board_geometry(int(math.sqrt(len(list_rep))) // 2)
+        _geometries_by_length[len(list_rep)] = geometry
+    return geometry
+
+
+# canonical_form : the smallest of the 8 rotated/mirrored versions of a list representation and which symmetry made it
+# Boards that are rotations or mirrors of each other have the same canonical form (and the same value).
+# A move m on list_rep is move geometry.symmetries[symmetry][m] on the canonical board.
+def canonical_form(list_rep):
+    geometry = geometry_of(list_rep)
+    best = None
+    best_symmetry = 0
+    for number, permutation in enumerate(geometry.symmetries):
+        transformed = [None] * geometry.cells
+        for index in range(geometry.cells):
+            transformed[permutation[index]] = list_rep[index]
+        transformed += list_rep[geometry.cells:]  # the turn again 'A' stays at the end
+        if best is None or transformed < best:
+            best = transformed
+            best_symmetry = number
+    return best, best_symmetry
+
+
 """
 Helper Functions 
 """
 
 # Optimized Action Finder for all individual boxes in game
 # Maps a box with their actions indices, actions are placed into sets that can easily be found later
+# (kept for anything that still wants sets, the search uses the BoardGeometry tables directly)
 
 
 def make_box_mapping(list_rep):
-    # Length of row to look through
-    line_length = int(math.sqrt(len(list_rep)))
-    
-    # the number of boxes in the list_representation
-    mappin = []
-    # once we make mapping, we are able to determine the status of each box to then determine game conditions
-    # start = 0
-
-    for start in range(0, len(list_rep) - (2 * line_length), 2 * line_length):
-        for index in range(0, line_length - 2, 2):
-            new_set = set()
-            # Math to grab each action (top left vertex is origin for each box)
-            new_set.add(start+index + 1)
-            new_set.add(start + line_length + index)
-            new_set.add(start + index + 1 + 2 * line_length)
-            new_set.add(start + index + line_length + 2)
-            mappin.append(new_set)
-    return mappin
+    return [set(edges) for edges in geometry_of(list_rep).box_edges]
+
+
+# box_totals : number of moves left ('?') on every box, in box order
+def box_totals(list_rep):
+    totals = []
+    for edges in geometry_of(list_rep).box_edges:
+        total = 0
+        for move in edges:
+            if list_rep[move] == '?':
+                total += 1
+        totals.append(total)
+    return totals
+
+
+# boxes_won : how many boxes (0, 1 or 2) the move at ind_number finishes
+# a box is finished when this move is the only '?' left on it
+def boxes_won(list_rep, ind_number):
+    geometry = geometry_of(list_rep)
+    won = 0
+    for box in geometry.edge_boxes[ind_number]:
+        left = 0
+        for move in geometry.box_edges[box]:
+            if list_rep[move] == '?':
+                left += 1
+        if left == 1:
+            won += 1
+    return won
             
 
 # CHECK IF STATE IS FINAL STATE - no moves remaining
 # We will do this by searching the list for any '?', these denote possible moves
 def check_final(list_rep):
+    if type(list_rep) is BitState:
+        return bit_check_final(list_rep)
+    if type(list_rep) is SearchState:
+        return list_rep.free == 0
     for slot in range(0, len(list_rep)):
         if list_rep[slot] == "?":
             return False
@@ -129,6 +280,10 @@ def check_final(list_rep):
 
 # number_of_actions : determine available number of available actions given a state
 def number_of_actions(list_rep):
+    if type(list_rep) is BitState:
+        return len(bit_actions_in(list_rep))
+    if type(list_rep) is SearchState:
+        return list_rep.free
     actions = 0
     for slot in range(0, len(list_rep)):
         if list_rep[slot] == "?":
@@ -141,6 +296,10 @@ def number_of_actions(list_rep):
 # the list of actions are denoted as action indices that still have '?' on them,
 # therefore they are moves that have not been used
 def actions_in(list_rep):
+    if type(list_rep) is BitState:
+        return bit_actions_in(list_rep)
+    if type(list_rep) is SearchState:
+        return list_rep.actions()
     actions = []  # list of indices of possible actions
     for moves in range(0,len(list_rep)):
         if list_rep[moves] == "?":
@@ -164,6 +323,10 @@ def actions_in(list_rep):
 
 
 def utility(list_rep):
+    if type(list_rep) is BitState:
+        return bit_utility(list_rep)
+    if type(list_rep) is SearchState:
+        return list_rep.utility()
     
     # if returns none, we have not gotten to a final state
     if check_final(list_rep):
@@ -207,130 +370,31 @@ Symbol Key:
 """
 
 
+#symbol to place for a move that wins 0, 1 or 2 boxes
+MIN_MARKS = ('+', 'O', 'o')
+MAX_MARKS = ('+', 'X', 'x')
+
+
 def min_successor(list_rep,ind_number):
-    mapping = make_box_mapping(list_rep)
-    boxes = []
+    if type(list_rep) is BitState:
+        return bit_successor(list_rep, ind_number, max_player=False, turn_again=False)
+    if type(list_rep) is SearchState:
+        return list_rep.successor(ind_number, max_player=False, turn_again=False)
     successor = list_rep.copy()
-
-    for set_item in mapping:
-        if ind_number in set_item:
-            # want index of whatever boxes contain this action
-            boxes.append(set_item)
-          
-    # if the length of boxes is greater than 2, then we know the number we sent it is on both boxes
-    # boxes contain the sets we need to check
-    # box 1, box 2
-    # (box 1 ?'s total, box 2 ?'s' total)
-
-    if len(boxes) > 1:  # then 2 is the only possible size
-        check_double_win = tuple()
-        box1 = 0
-        box2 = 0
-        set1 = boxes[0]
-        set2 = boxes[1]
-        
-        for number in set1:
-            if list_rep[number] == '?':
-                box1 += 1
-        for numbers in set2:
-            if list_rep[numbers] == '?':
-                box2 += 1
-                    
-        if box1 == 1 and box2 == 1:
-            # Then the 1 leftover is this possible move, which would trigger both boxes to be owned by this player
-            successor[ind_number] = 'o'
-        
-            return successor
-        elif box1 == 1 and box2 != 1:
-            successor[ind_number] = 'O'
-          
-            return successor
-        elif box2 == 1 and box1 != 1:
-            successor[ind_number] = 'O'
-          
-            return successor
-        else:
-            successor[ind_number] = '+'
-            return successor
-    
-    win_if_one = 0
-    only_one = boxes[0]
-    for num in only_one:
-        if list_rep[num] == '?':
-            win_if_one += 1
-        
-    if win_if_one == 1: # I have to check for one box is this is the winning move
-        successor[ind_number] = 'O'
-          
-        return successor
-    else:
-        successor[ind_number] = '+'
-        return successor
+    # + if no box is finished, O if one box is, o if this one move finishes both of its boxes
+    successor[ind_number] = MIN_MARKS[boxes_won(list_rep, ind_number)]
+    return successor
 
 
 def max_successor(list_rep, ind_number):
-    mapping = make_box_mapping(list_rep)
-    boxes = []
+    if type(list_rep) is BitState:
+        return bit_successor(list_rep, ind_number, max_player=True, turn_again=False)
+    if type(list_rep) is SearchState:
+        return list_rep.successor(ind_number, max_player=True, turn_again=False)
     successor = list_rep.copy()
-
-    # Get boxes that have this move, indicated by a specefic index in the list representation
-    for set_item in mapping:
-        if ind_number in set_item:
-            # want index of whatever boxes contain this action
-            boxes.append(set_item)
-        
-    # if the length of boxes is greater than 2, then we know the number we sent it is on both boxes
-    # boxes contain the sets we need to check
-    # box 1, box 2
-    # (box 1 ?'s total, box 2 ?'s' total)
-
-    if len(boxes) > 1: # if checkng a move that is part of two boxes
-        check_double_win = tuple()
-        box1 = 0
-        box2 = 0
-        set1 = boxes[0]
-        set2 = boxes[1]
-        
-        for number in set1:
-            if list_rep[number] == '?':
-                box1 += 1
-        for numbers in set2:
-            if list_rep[numbers] == '?':
-                box2 += 1
-                    
-        if box1 == 1 and box2 == 1:
-            # Then the 1 leftover is this possible move, which would trigger both boxes to be owned by this player
-            successor[ind_number] = 'x'
-            
-            return successor
-        # if box one is still a box win, then we want to lable it as such
-        elif box1 == 1 and box2 != 1:
-            successor[ind_number] = 'X'
-           
-            return successor
-        # if box two is still a box win, we want to lable it as X
-        elif box2 == 1 and box1 != 1:
-            successor[ind_number] = 'X'
-          
-            return successor
-        # if no wins are present, we want to lable it as a standard move
-        else:
-            successor[ind_number] = '+'
-            return successor
-    
-    # checking a move that is part of only one box
-    win_if_one = 0
-    only_one = boxes[0]
-    for num in only_one:
-        if list_rep[num] == '?':
-            win_if_one += 1
-        
-    if win_if_one == 1:  # I have to check for one box is this is the winning move
-        successor[ind_number] = 'X'
-        return successor
-    else:
-        successor[ind_number] = '+'
-        return successor
+    # + if no box is finished, X if one box is, x if this one move finishes both of its boxes
+    successor[ind_number] = MAX_MARKS[boxes_won(list_rep, ind_number)]
+    return successor
                     
 
 """ 
@@ -342,144 +406,44 @@ The player receiving the list with A recognizes this and send the game state bac
 
 
 def min_successor_A(list_rep, ind_number):
+    if type(list_rep) is BitState:
+        return bit_successor(list_rep, ind_number, max_player=False, turn_again=True)
+    if type(list_rep) is SearchState:
+        return list_rep.successor(ind_number, max_player=False, turn_again=True)
+
     # THIS MEANS THAT THE OTHER PLAYER WON A BOX AND GETS TO GO AGAIN, MAKE SURE TO REMOVE A
     if list_rep[-1] == 'A':
         successor = list_rep.copy()
         successor.remove('A')
         return successor
-    
-    
-    # if final move in box, then put O to show that O won that box
-    mapping = make_box_mapping(list_rep)
-    boxes = []
-    
-    successor = list_rep.copy()
 
-    for set_item in mapping:
-        if ind_number in set_item:
-            # want index of whatever boxes contain this action
-            boxes.append(set_item)
-          
-    # if the length of boxes is greater than 2, then we know the number we sent it is on both boxes
-    # boxes contain the sets we need to check
-    # box 1, box 2
-    # (box 1 ?'s total, box 2 ?'s' total)
-
-    if len(boxes) > 1:  # then 2 is the only possible size
-        box1 = 0
-        box2 = 0
-        set1 = boxes[0]
-        set2 = boxes[1]
-        
-        for number in set1:
-            if list_rep[number] == '?':
-                box1 += 1
-        for numbers in set2:
-            if list_rep[numbers] == '?':
-                box2 += 1
-                    
-        if box1 == 1 and box2 == 1:
-            # Then the 1 leftover is this possible move, which would trigger both boxes to be owned by this player
-            successor[ind_number] = 'o'
-            successor.append("A")
-            return successor
-        elif box1 == 1 and box2 != 1:
-            successor[ind_number] = 'O'
-            successor.append("A")
-            return successor
-        elif box2 == 1 and box1 != 1:
-            successor[ind_number] = 'O'
-            successor.append("A")
-            return successor
-        else:
-            successor[ind_number] = '+'
-            return successor
-    
-    win_if_one = 0
-    only_one = boxes[0]
-    for num in only_one:
-        if list_rep[num] == '?':
-            win_if_one += 1
-        
-    if win_if_one == 1:  # Box winning move
-            successor[ind_number] = 'O'
-            successor.append("A")  # addded and eventually deleted from list representation, marker for additional turn
-            return successor
-    else:
-        successor[ind_number] = '+'
-        return successor
+    successor = list_rep.copy()
+    won = boxes_won(list_rep, ind_number)
+    # if final move in box, then put O to show that O won that box
+    successor[ind_number] = MIN_MARKS[won]
+    if won:
+        successor.append("A")  # addded and eventually deleted from list representation, marker for additional turn
+    return successor
 
 
 # This is same as min successor but winning moves are intead denoted as X and x (Big X for single win, little x for double)
 def max_successor_A(list_rep, ind_number):
+    if type(list_rep) is BitState:
+        return bit_successor(list_rep, ind_number, max_player=True, turn_again=True)
+    if type(list_rep) is SearchState:
+        return list_rep.successor(ind_number, max_player=True, turn_again=True)
+
     if list_rep[-1] == 'A':
         successor = list_rep.copy()
         successor.remove('A')
         return successor
-    
-    mapping = make_box_mapping(list_rep)
-    boxes = []
-    
+
     successor = list_rep.copy()
-    
-    # Get boxes that have this move, indicated by a specefic index in the list representation
-    for set_item in mapping:
-        if ind_number in set_item:
-            # want index of whatever boxes contain this action
-            boxes.append(set_item)
-        
-    # if the length of boxes is greater than 2, then we know the action impacts two boxes
-    # boxes contain the sets we need to check
-    # box 1, box 2
-    # (box 1 ?'s total, box 2 ?'s' total)
-
-    if len(boxes) > 1:  # if checking a move that is part of two boxes
-        box1 = 0
-        box2 = 0
-        set1 = boxes[0]  # this can be hardcoded because it's the only option if len > 1
-        set2 = boxes[1]
-        
-        for number in set1:
-            if list_rep[number] == '?':
-                box1 += 1
-        for numbers in set2:
-            if list_rep[numbers] == '?':
-                box2 += 1
-                    
-        if box1 == 1 and box2 == 1:
-            # Then the 1 leftover is this possible move, which would trigger both boxes to be owned by this player
-            successor[ind_number] = 'x'
-            successor.append("A")
-            return successor
-        #if box one is still a box win, then we want to lable it as such
-        elif box1 == 1 and box2 != 1:
-            successor[ind_number] = 'X'
-            successor.append("A")
-            return successor
-        #if box two is still a box win, we want to lable it as X
-        elif box2 == 1 and box1 != 1:
-            successor[ind_number] = 'X'
-            successor.append("A")
-            return successor
-        #if no wins are present, we want to lable it as a standard move
-        else:
-            successor[ind_number] = '+'
-            return successor
-    
-    #checking a move that is part of only one box 
-    win_if_one = 0
-    only_one = boxes[0]
-    for num in only_one:
-        if list_rep[num] == '?':
-            win_if_one += 1
-        
-    if win_if_one == 1: #Box winning move
-        successor[ind_number] = 'X'
-        successor.append("A") #The A added on to the list representation will get deleted after the additional turn is taken, turn marker
-        return successor
-    else:
-        successor[ind_number] = '+'
-        return successor
+    won = boxes_won(list_rep, ind_number)
+    successor[ind_number] = MAX_MARKS[won]
+    if won:
+        successor.append("A")  #The A added on to the list representation will get deleted after the additional turn is taken, turn marker
+    return successor
                     
 
 
@@ -505,32 +469,23 @@ One player valuing +, another -.
 
 def calculate_winning_boxes(list_rep):
     #figure out which boxes only have one move left
-    mappin = make_box_mapping(list_rep)
     number_of_winning_boxes = 0
-    for key in mappin:
-        total = 0
-        stored_box = mappin[key]
-        for move in stored_box:
-            if list_rep[move] == '?':
-                total += 1
+    for total in box_totals(list_rep):
         if total == 1:
             number_of_winning_boxes += 1
     return number_of_winning_boxes
             
 #greedy evaluate, only a good state when there is one box able to be won, everything else is eh
 def snatch_evaluate_max(list_rep):
-    #Mapping for each box
-    mappin = make_box_mapping(list_rep)
-    size = int(math.sqrt(len(list_rep))) // 2
+    if type(list_rep) is not list:
+        return state_evaluate(list_rep, snatch_evaluate_max)
+    #Moves left on each box come from the board geometry
+    size = geometry_of(list_rep).size
     boxes = size ** 2
     ratio = (size - .1) / boxes #the ratio to add to each box that you could win
     evaluate = 0
     
-    for sets in mappin:
-        total = 0
-        for move in sets:
-            if list_rep[move] == '?':
-                total += 1
+    for total in box_totals(list_rep):
         if total == 1:
             #do something to the value of the state
             evaluate += ratio
@@ -539,18 +494,15 @@ def snatch_evaluate_max(list_rep):
     return evaluate
 #This will priortize finishing boxes, with less priortization on 3 and 4 boxes, while avoiding states that create that set up 3 boxes for the other player
 def action_evaluate_max(list_rep):
-    #mapping for each box
-    mappin = make_box_mapping(list_rep)
-    size = int(math.sqrt(len(list_rep))) // 2
+    if type(list_rep) is not list:
+        return state_evaluate(list_rep, action_evaluate_max)
+    #moves left on each box come from the board geometry
+    size = geometry_of(list_rep).size
     boxes = size ** 2
     ratio = 1 / (boxes - 0.1) 
     evaluate = 0
     
-    for sets in mappin:
-        total = 0
-        for move in sets:
-            if list_rep[move] == '?':
-                total += 1
+    for total in box_totals(list_rep):
         if total == 1:
             evaluate += ratio
         elif total == 2: # if total 2, then it favors the other player, and so we will rate it lower
@@ -565,19 +517,16 @@ def action_evaluate_max(list_rep):
 #This evaluation prioritizes settuping up boxes to be crossed, it prefers placing them o boxes with 3 or 4 moves left, 
 #but will finish up boxes before it places on value 2      
 def set_up_evaluate_max(list_rep):
+    if type(list_rep) is not list:
+        return state_evaluate(list_rep, set_up_evaluate_max)
     #we want to be able to complete the most number of boxes with a series of box wins
     #lets value 
-    mappin = make_box_mapping(list_rep)
-    size = int(math.sqrt(len(list_rep))) // 2
+    size = geometry_of(list_rep).size
     boxes = size ** 2
     ratio = 1 / (boxes - 0.1) #will never total 1 or -1
     evaluate = 0
     
-    for sets in mappin:
-        total = 0
-        for move in sets:
-            if list_rep[move] == '?':
-                total += 1
+    for total in box_totals(list_rep):
         if total == 1:
             evaluate +=ratio / 2
         elif total == 2: # if total 2, then it favors the other player, and so we will rate it lower
@@ -592,18 +541,15 @@ def set_up_evaluate_max(list_rep):
 
 #greedy evaluate, only a good state when there is one box able to be won, everything else is eh
 def snatch_evaluate_min(list_rep):
-    #Mapping for each box
-    mappin = make_box_mapping(list_rep)
-    size = int(math.sqrt(len(list_rep))) // 2
+    if type(list_rep) is not list:
+        return state_evaluate(list_rep, snatch_evaluate_min)
+    #Moves left on each box come from the board geometry
+    size = geometry_of(list_rep).size
     boxes = size ** 2
     ratio = (size - .1) / boxes #the ratio to add to each box that you could win
     evaluate = 0
     
-    for sets in mappin:
-        total = 0
-        for move in sets:
-            if list_rep[move] == '?':
-                total += 1
+    for total in box_totals(list_rep):
         if total == 1:
             evaluate -= ratio
         #always be picking states for when we are able to complete a box
@@ -613,18 +559,15 @@ def snatch_evaluate_min(list_rep):
 #This will priortize finishing boxes, with less priortization on 3 and 4 boxes,
 # while avoiding states that create that set up 3 boxes for the other player
 def action_evaluate_min(list_rep):
-    #mapping for each box
-    mappin = make_box_mapping(list_rep)
-    size = int(math.sqrt(len(list_rep))) // 2
+    if type(list_rep) is not list:
+        return state_evaluate(list_rep, action_evaluate_min)
+    #moves left on each box come from the board geometry
+    size = geometry_of(list_rep).size
     boxes = size ** 2
     ratio = 1 / (boxes - 0.1) #will never total 1 or -1
     evaluate = 0
     
-    for sets in mappin:
-        total = 0
-        for move in sets:
-            if list_rep[move] == '?':
-                total += 1
+    for total in box_totals(list_rep):
         if total == 1:
             evaluate -= ratio
         elif total == 2: # if total 2, then it favors the other player, and so we will rate it lower
@@ -640,19 +583,16 @@ def action_evaluate_min(list_rep):
 #but will finish up boxes before it places on value 2      
 
 def set_up_evaluate_min(list_rep):
+    if type(list_rep) is not list:
+        return state_evaluate(list_rep, set_up_evaluate_min)
     #we want to be able to complete the most number of boxes with a series of box wins
     #lets value 
-    mappin = make_box_mapping(list_rep)
-    size = int(math.sqrt(len(list_rep))) // 2
+    size = geometry_of(list_rep).size
     boxes = size ** 2
     ratio = 1 / (boxes - 0.1) #will never total 1 or -1
     evaluate = 0
     
-    for sets in mappin:
-        total = 0
-        for move in sets:
-            if list_rep[move] == '?':
-                total += 1
+    for total in box_totals(list_rep):
         if total == 1:
             evaluate -= ratio / 2
         elif total == 2: # if total 2, then it favors the other player, and so we will rate it lower
@@ -664,369 +604,3640 @@ def set_up_evaluate_min(list_rep):
       
 
 """
-Min and Max Alpha Beta with current depth and eventual limit search 
-
-max_value_2/min_value_2 does not implement the additional turn after winning a box for said player
-
-max_value_2A/min_value_2A contains the additional turn after winning a box for said player
+Evaluate Weights
 
-Evaluate functions passed to each player 
+Every evaluate function above only looks at how many moves are left on each box.
+evaluate_weights returns what an evaluate function adds for a box with 0, 1, 2, 3 or 4 moves left,
+so the faster state representations below can score a board without building the list representation.
+weighted_evaluate adds the weights box by box in the same order as the loops above, so the values are identical.
 """
 
-from math import inf
-
-#initalized comparison values for Alpha Beta pruning
-neg_infinity = -inf
-pos_infinity = inf
+#cached weights for each (evaluate function, size)
+_evaluate_weights = dict()
 
-def max_value_2(state, max_eval, min_eval, alpha, beta, depth, limit):
-    check_value = utility(state)
-    check_eval = max_eval(state)
-    return_tuple = ()
-    if depth == limit or check_value !=None: #we reached furtheast state looking ahead or we got to a final state
-        
-        if check_value !=None: #final state
-            return (check_value,None)
-        else:
-            return (check_eval,None) #not final, we hit depth limit,return eval
-    
-    else: #Looking at other game states... we have not hit limit or a final state
-
-        value = neg_infinity #initalized value to compare against
-        actions_for_state = actions_in(state)
-        new_depth = depth + 1
-
-        for possible_moves in actions_for_state:
-            succ = max_successor(state,possible_moves) 
-            values, move = min_value_2(succ,max_eval, min_eval, alpha,beta,new_depth,limit) 
-            replace_Value = values 
-            #gets the state that had that value, able to iterate through both states, and their values
-
-            #Alpha Beta Pruning: Able to ignore state pathways that offer worse options
-            if replace_Value > value:
-                value = replace_Value
-                return_tuple = (value,possible_moves)
-            if replace_Value > alpha:
-                alpha = replace_Value
-            if alpha >= beta:
-                break #go to next successor, we can skip
-
-        return return_tuple #value of state, the action taken
-
-
-def min_value_2(state,max_eval, min_eval, alpha, beta, depth, limit):
-    tuple_r = ()
-    check_state_value = utility(state)
-    check_Eval = min_eval(state)
-    
-    if depth == limit or check_state_value !=None: 
-        
-        if check_state_value !=None: #final state
-            return (check_state_value,None)
-        else:
-            return (check_Eval,None) #not final, we hit depth limit,return eval
-    
-    else:
-        value_start = pos_infinity
-        actions = actions_in(state)
-        new_Depth = depth + 1
-        
-        for next_moves in actions:
-            next_state = min_successor(state,next_moves) 
-            values, moves = max_value_2(next_state,max_eval, min_eval, alpha,beta,new_Depth,limit)
-            replace_value = values 
-            #gets the state that had that value, able to iterate through both states, and their values
-            if replace_value < value_start:
-                value_start = replace_value
-                tuple_r = (value_start, next_moves)
-            if replace_value < beta:
-                beta = replace_value
-            if alpha >= beta:
-                break #go to next successor
-        
-        return tuple_r
-    
 
+def evaluate_weights(evaluate, size):
+    key = (evaluate, size)
+    if key in _evaluate_weights:
+        return _evaluate_weights[key]
 
-"""
-Max algorithm with additional turn after box completion
-A = Again as in turn again 
-"""
-def max_value_2A(state, max_eval, min_eval, alpha, beta, depth, limit):
-    check_value = utility(state)
-    check_eval = max_eval(state)
-    return_tuple = ()
-    if depth == limit or check_value !=None: 
-        
-        if check_value !=None: #final state
-            return (check_value,None)
-        else:
-            return (check_eval,None) #not final, we hit depth limit,return eval
-    
+    boxes = size ** 2
+    if evaluate is snatch_evaluate_max or evaluate is snatch_evaluate_min:
+        ratio = (size - .1) / boxes
+        weights = (0, ratio, 0, 0, 0)
+    elif evaluate is action_evaluate_max or evaluate is action_evaluate_min:
+        ratio = 1 / (boxes - 0.1)
+        weights = (0, ratio, -(ratio / 2), ratio / 2, ratio / 2)
+    elif evaluate is set_up_evaluate_max or evaluate is set_up_evaluate_min:
+        ratio = 1 / (boxes - 0.1)
+        weights = (0, ratio / 2, -(ratio / 2), ratio, ratio)
     else:
-        value = neg_infinity
-        actions_for_state = actions_in(state)
-        new_depth = depth + 1
-
-        for possible_moves in actions_for_state:
-            succ = max_successor_A(state,possible_moves) 
-            values, move = min_value_2A(succ,max_eval, min_eval, alpha,beta,new_depth,limit) 
-            replace_Value = values 
-                #gets the state that had that value, able to iterate through both states, and their values
-            if replace_Value > value:
-                value = replace_Value
-                return_tuple = (value,possible_moves)
-            if replace_Value > alpha:
-                alpha = replace_Value
-            if alpha >= beta:
-                break #go to next successor
+        weights = None  # not one of ours, callers fall back to the list representation
 
+    if weights is not None and evaluate in (snatch_evaluate_min, action_evaluate_min, set_up_evaluate_min):
+        weights = tuple(-weight for weight in weights)  # min versions value everything the other way
 
-        return return_tuple
+    _evaluate_weights[key] = weights
+    return weights
 
 
-"""
-Min algorithm with additional turn after box completion
-A = Again as in turn again
-"""
-def min_value_2A(state,max_eval, min_eval, alpha, beta, depth, limit):
-    tuple_r = ()
-    check_state_value = utility(state)
-    check_Eval = min_eval(state)
-    
-    if depth == limit or check_state_value !=None: 
-        
-        if check_state_value !=None: #final state
-            
-            return (check_state_value,None)
-        else:
-            return (check_Eval,None) #not final, we hit depth limit,return eval
-    
-    else:
-        value_start = pos_infinity
-        
-        actions = actions_in(state)
-        new_Depth = depth + 1
-        
-        for next_moves in actions:
-            next_state = min_successor_A(state,next_moves) 
-            values, moves = max_value_2A(next_state,max_eval, min_eval, alpha,beta,new_Depth,limit)
-            replace_value = values 
-            
-            #gets the state that had that value, able to iterate through both states, and their values
-            if replace_value < value_start:
-                value_start = replace_value
-                tuple_r = (value_start, next_moves)
-            if replace_value < beta:
-                beta = replace_value
-            if alpha >= beta:
-                break #go to next successor
-        
-        return tuple_r
+def weighted_evaluate(totals, weights):
+    evaluate = 0
+    for total in totals:
+        weight = weights[total]
+        if weight:
+            evaluate += weight
+    return evaluate
+
 
 """
-For Testing Purposes 
-THIS IS A RANDOM PLAYER, HE WILL BE CONSIDERED A MIN PLAYER 
-"""
-from random import randint
+Bitboard Game State
 
-def Randy_Random(state):
-    
-    randy_moves = actions_in(state)
-    randy_state = state.copy()
-    ranGe = len(randy_moves)
-    randy_choice = randint(0, ranGe-1) #top end it can be equal to, we need to subtract by 1 for the correct range of possible indices
-    
-    #This is the index of the random action Randy will manipulate in the state
-    his_move = randy_moves[randy_choice]
-    
-    #This is the new state after randy has acted upon it
-    final_state = min_successor(randy_state, his_move)
-    
-    return final_state
+A second representation of the same game that is much cheaper to copy and to search.
+Lines drawn are the bits of one integer, bit i is the same index i used in make_list_rep,
+so moves have the same indices in both representations and can be passed to the same functions.
+Boxes won are kept as two more integers (one for max, one for min), bit b is box b of the BoardGeometry.
+again is the turn again marker, the same job the trailing 'A' does in the list representation.
 
-"""
-Print Representation
+The list helper functions (actions_in, utility, successors, evaluate functions, draw_DBQ) all accept a BitState
+(and the SearchState further down),
+so the alpha beta search and the game simulations work on either representation.
 """
 
-def draw_DBQ(list_rep):
-    line_number = 0
-    for get_line in range(0, len(list_rep), int(math.sqrt(len(list_rep)))):
+BitState = namedtuple("BitState", ["size", "drawn", "max_boxes", "min_boxes", "again"])
 
-        #Either printing - or | two cases to sift through
+def make_bit_rep(size):
+    return BitState(size, 0, 0, 0, False)
 
-        if line_number % 2 != 0:#odd line number, |, " ", or box winning identifiers
-            print("\n")
-            for index_v in range(0, int(math.sqrt(len(list_rep)))): # size_l *2 + 1, math to cycle through said line
-            
-                if list_rep[index_v + get_line] == '+': 
-                    print("|", end = " ")
-                elif list_rep[index_v + get_line] == 'X': 
-                    print("X", end = " ")
-                elif list_rep[index_v + get_line] == 'x': 
-                    print("x", end = " ")
-                elif list_rep[index_v + get_line] == 'o': 
-                    print("o", end = " ")
-                elif list_rep[index_v + get_line] == 'O':
-                    print("O", end = " ")
-                elif list_rep[index_v + get_line] == '?':
-                    print("?", end = " ")
-                else:
-                    print(" ", end = " ")
-        else: #its even *, -, or box winning identifiers
-            print("\n")
-            for index in range(0, int(math.sqrt(len(list_rep)))): 
-                if list_rep[index + get_line] == '*':
-                    print("*", end  = " ")
-                elif list_rep[index + get_line] == '?':
-                    print("?", end = " ")
-                elif list_rep[index + get_line] == '+':
-                    print("-", end = " ")
-                elif list_rep[index + get_line] == 'X': 
-                    print("X", end = " ")
-                elif list_rep[index + get_line] == 'O': 
-                    print("O", end = " ")
-                elif list_rep[index + get_line] == 'x': 
-                    print("x", end = " ")
-                elif list_rep[index + get_line] == 'o': 
-                    print("o", end = " ")
-                else:
-                    print(" ", end = " ")
 
-        line_number += 1
+def bit_actions_in(state):
+    free = board_geometry(state.size).all_moves & ~state.drawn
+    actions = []
+    while free:
+        lowest = free & -free
+        actions.append(lowest.bit_length() - 1)  # ascending, same order as actions_in
+        free ^= lowest
+    return actions
 
 
+def bit_check_final(state):
+    return state.drawn == board_geometry(state.size).all_moves
 
-""" 
-Game Simulations
-Game Simulation 2 will run an evaluate pairing for a number of different sized games, 
-starting at 2 X 2 up to whatever max size is declared. 
-This simulation is not used for testing but is available to determine if the size of the game impacts the matchup. 
-To reduce runtime of implementing this I opted for comparing matchups against game mechanics.  
- 
-Game Simulation 3 and 3A run any number of games at any given size. 
-Both min and max evaluate algorthims are passed. 
- 
-Game simulation 3 does not have the turn again mechanic.
- 
-Game simulation 3A does have the turn again mechanic. 
-"""
 
-def game_simulation_2(games_played,max_size_of_game, max_eval,min_eval):
-    record_maps = dict()
-    for size_of_game in range(2, max_size_of_game):
-        record = [0, 0, 0]
-        
-        for games in range(games_played):
-            env = make_list_rep(size_of_game)
-            actions = number_of_actions(env)
-            for turn in range(1,actions + 1):
-                if turn % 2 == 0:
-                    value, action = max_value_2(env, max_eval, min_eval, alpha=- 1, beta=+ 1, depth=0, limit=3)
-                    env = max_successor(env, action)
-                else:
-                    value, action = min_value_2(env, max_eval, min_eval, alpha=- 1, beta=+ 1, depth=0, limit=3)
-                    env = min_successor(env, action)
-            
-                u = utility(env)
-                if u is not None: #-1, min win, 0 = tie, 1 = max win
-                    record[u] += 1
-                    break
-        record_maps[size_of_game] = record
-    return record_maps #returns the record
+def bit_utility(state):
+    if state.drawn != board_geometry(state.size).all_moves:
+        return None
+    score = state.max_boxes.bit_count() - state.min_boxes.bit_count()
+    if score > 0:
+        return 1
+    elif score < 0:
+        return -1
+    else:
+        return 0
 
-#Different simulatoed games that are then later graphed
-def game_simulation_3(games_played,size_of_game,max_eval,min_eval):
-    record = [0, 0, 0]
-        
-    for games in range(games_played):
-        env = make_list_rep(size_of_game)
-        actions = number_of_actions(env)
-        for turn in range(1, actions + 1):
-            if turn % 2 == 0:
-                value, action = max_value_2(env, max_eval, min_eval, alpha=-1, beta=+1, depth=0, limit=3)
-                env = max_successor(env, action)
-                
-            else:
-                value, action = min_value_2(env, max_eval, min_eval, alpha=-1, beta=+1, depth=0, limit=3)
-                env = min_successor(env, action)
-            
-            u = utility(env)
-            if u is not None:
-                record[u] += 1
-                break
-    return record #returns the record
 
-#Different simulatoed games that are then later graphed
-def game_simulation_3A(games_played,size_of_game,max_eval,min_eval):
-    record = [0, 0, 0]
-    for games in range(games_played):
-        env = make_list_rep(size_of_game)
-        #actions = number_of_actions(env)
-        turn = 0
-        while utility(env) == None:
-            if turn % 2 == 0:
-                value, action = max_value_2A(env,max_eval,min_eval, alpha=-1, beta=+1, depth=0, limit=3)
-                env = max_successor_A(env, action)
-            else:
-                value, action = min_value_2A(env,max_eval,min_eval, alpha=-1, beta=+1, depth=0, limit=3)
-                env = min_successor_A(env,action)
-            
-            u = utility(env)
-            if u is not None:
-                record[u] += 1
-                break
-            turn += 1
-    return record #returns the record
+# one successor for all four list versions, the player and the rule variant are passed in
+def bit_successor(state, ind_number, max_player, turn_again):
+    if turn_again and state.again:
+        # the other player won a box and goes again, this turn is only used up removing the marker
+        return state._replace(again=False)
 
-""" 
-After running experiment we have found that turn again mechanic does not influence the evaluate matchup outcome.
-The better evaluate function dominates whether the mathcup whether the mechanic is present or not.
-"""
+    drawn = state.drawn | 1 << ind_number
+    won = 0
+    for box_bit, box_mask in board_geometry(state.size).edge_box_masks[ind_number]:
+        if (drawn & box_mask) == box_mask:
+            won |= box_bit
 
+    if max_player:
+        return BitState(state.size, drawn, state.max_boxes | won, state.min_boxes, turn_again and won != 0)
+    else:
+        return BitState(state.size, drawn, state.max_boxes, state.min_boxes | won, turn_again and won != 0)
 
 
-#My System: 1 minute and 30 seconds to run.
+# moves left on every box, in box order
+def bit_box_totals(state):
+    geometry = board_geometry(state.size)
+    free = geometry.all_moves & ~state.drawn
+    return [(box_mask & free).bit_count() for box_mask in geometry.box_masks]
 
-import matplotlib.pyplot as plt
-#snatch_evaluate_min/max
-#action_evaluate_min/max
-#set_up_evaluate_min/max
 
-#This helper function will graph using the metplotlib.pyplot
-def make_graph(plot,string_title,x_label, y_label, bar_0, bar_1):
-    plot.bar(bar_0,bar_1)
-    plot.title(string_title)
-    plot.xlabel(x_label)
-    plot.ylabel(y_label)
-    plot.show()
+def bit_evaluate(state, evaluate):
+    weights = evaluate_weights(evaluate, state.size)
+    if weights is None:
+        return evaluate(bit_to_list(state))
+    return weighted_evaluate(bit_box_totals(state), weights)
 
-if __name__ == "__main__":
-    #these will become the x-labels of each of the graphs, depedning on the pairings
-    s_a = ["Ties", "Snatch Wins", "Action Wins "]
-    se_a = ["Ties", "Set up Wins", "Action Wins"]
-    s_se = ["Ties", "Snatch Evaluate", "Set up Evaluate"]
 
+# Converters between the two representations
+def list_to_bit(list_rep):
+    geometry = geometry_of(list_rep)
+    box_masks = geometry.box_masks
 
-    #NO TURN AGAIN
-    game_s_a = game_simulation_3(50,3, snatch_evaluate_max, action_evaluate_min)
-    game_se_a = game_simulation_3(50,3,set_up_evaluate_max, action_evaluate_min)
-    game_s_se = game_simulation_3(50,3,snatch_evaluate_max, set_up_evaluate_min)
+    drawn = 0
+    wins_left = dict()  # winning moves and how many boxes they still have to be matched with
+    for move in geometry.moves:
+        if list_rep[move] != '?':
+            drawn |= 1 << move
+        if list_rep[move] in ('X', 'O'):
+            wins_left[move] = 1
+        elif list_rep[move] in ('x', 'o'):
+            wins_left[move] = 2
 
-    #Turn Again after box win
-    game_s_a_T = game_simulation_3A(50,3, snatch_evaluate_max, action_evaluate_min)
-    game_se_a_T = game_simulation_3A(50,3,set_up_evaluate_max, action_evaluate_min)
-    game_s_se_T = game_simulation_3A(50,3,snatch_evaluate_max, set_up_evaluate_min)
+    # The list only marks the move that won a box, so every finished box is matched with a winning move on it.
+    # Boxes with only one possible winning move are matched first, ambiguous ones take their first option
+    unmatched = [number for number, mask in enumerate(box_masks) if (drawn & mask) == mask]
+    max_boxes = 0
+    min_boxes = 0
+    while unmatched:
+        options = dict()
+        for number in unmatched:
+            options[number] = [move for move in wins_left if wins_left[move] and box_masks[number] >> move & 1]
+        forced = [number for number in unmatched if len(options[number]) == 1]
+        if not forced:
+            forced = [number for number in unmatched if options[number]][:1]
+            if not forced:
+                break  # nothing left to match them with
+        for number in forced:
+            move = options[number][0]
+            if wins_left[move] == 0:
+                continue  # used up by another forced box this pass, try again next pass
+            wins_left[move] -= 1
+            if list_rep[move] in ('X', 'x'):
+                max_boxes |= 1 << number
+            else:
+                min_boxes |= 1 << number
+            unmatched.remove(number)
 
+    return BitState(geometry.size, drawn, max_boxes, min_boxes, list_rep[-1] == 'A')
 
 
-    make_graph(plt,"No Turn Again: Action vs. Snatch", "Evaluate Function","Total Wins",s_a,game_s_a)
-    make_graph(plt,"No Turn Again: Set Up vs. Action", "Evaluate Function", "Total Wins", se_a, game_se_a)
-    make_graph(plt,"No Turn Again: Snatch vs. Set Up", "Evaluate Function","Total Wins",s_se,game_s_se)
+def bit_to_list(state):
+    list_rep = make_list_rep(state.size)
+    geometry = board_geometry(state.size)
+    for move in geometry.moves:
+        if state.drawn >> move & 1:
+            list_rep[move] = '+'
 
-    make_graph(plt,"Turn Again: Action vs. Snatch", "Evaluate Function", "Total Wins", s_a, game_s_a_T)
-    make_graph(plt,"Turn Again: Set Up vs. Action", "Evaluate Function","Total Wins",se_a,game_se_a_T)
-    make_graph(plt,"Turn Again: Snatch vs. Set Up", "Evaluate Function", "Total Wins", s_se, game_s_se_T)
+    # put each box owner on one of the lines of the box, two boxes on one line become x or o
+    for number, edges in enumerate(geometry.box_edges):
+        if state.max_boxes >> number & 1:
+            owner = 'X'
+        elif state.min_boxes >> number & 1:
+            owner = 'O'
+        else:
+            continue
+        for move in edges:
+            if list_rep[move] == '+':
+                list_rep[move] = owner
+                break
+            if list_rep[move] == owner:
+                list_rep[move] = owner.lower()
+                break
 
+    if state.again:
+        list_rep.append('A')
+    return list_rep
 
 
+"""
+In Place Search State
+
+The successor functions copy the whole state for every node the search looks at.
+SearchState is one mutable state the search walks instead: apply(move) draws a line and undo() takes it back.
+It keeps how many moves are left on every box, how many moves are left in the game and both scores,
+so finding won boxes, final states and the utility never needs to look through the board.
+
+max_to_move is the player whose turn it is, it flips on every apply (and back on undo).
+again is the turn again marker like the trailing 'A': the player to move only hands the turn back.
+key is the Zobrist hash of the lines drawn, the player to move, the turn again marker and the score difference,
+kept up to date by apply/undo. Use set_turn to change the player or the rules so the key follows.
+symmetry_key holds the line hashes of all 8 rotated/mirrored boards, canonical_key picks the smallest.
+"""
+
+
+class SearchState:
+
+    def __init__(self, size, turn_again=False, max_to_move=True):
+        geometry = board_geometry(size)
+        self.geometry = geometry
+        self.size = size
+        self.turn_again = turn_again
+        self.max_to_move = max_to_move
+        self.drawn = bytearray(geometry.cells)  # 1 where a line is drawn, same indices as make_list_rep
+        self.box_left = [4] * geometry.boxes  # moves left on each box
+        self.box_owner = [0] * geometry.boxes  # 1 max, -1 min, 0 not won yet
+        self.free = len(geometry.moves)  # moves left in the game
+        self.max_score = 0
+        self.min_score = 0
+        self.again = False
+        self.history = []  # moves applied, -1 for a turn handed back
+        self.key = self.compute_key()
+        self.symmetry_key = 0
+
+    @classmethod
+    def from_bit(cls, bit_state, turn_again=False, max_to_move=True):
+        state = cls(bit_state.size, turn_again, max_to_move)
+        geometry = state.geometry
+        for move in geometry.moves:
+            if bit_state.drawn >> move & 1:
+                state.drawn[move] = 1
+                state.free -= 1
+                for box in geometry.edge_boxes[move]:
+                    state.box_left[box] -= 1
+        for box in range(geometry.boxes):
+            if bit_state.max_boxes >> box & 1:
+                state.box_owner[box] = 1
+                state.max_score += 1
+            elif bit_state.min_boxes >> box & 1:
+                state.box_owner[box] = -1
+                state.min_score += 1
+        state.again = turn_again and bit_state.again
+        state.key = state.compute_key()
+        for move in geometry.moves:
+            if state.drawn[move]:
+                state.symmetry_key ^= geometry.zobrist_symmetric[move]
+        return state
+
+    @classmethod
+    def from_list(cls, list_rep, turn_again=False, max_to_move=True):
+        return cls.from_bit(list_to_bit(list_rep), turn_again, max_to_move)
+
+    def to_bit(self):
+        drawn = 0
+        for move in self.geometry.moves:
+            if self.drawn[move]:
+                drawn |= 1 << move
+        max_boxes = 0
+        min_boxes = 0
+        for box, owner in enumerate(self.box_owner):
+            if owner == 1:
+                max_boxes |= 1 << box
+            elif owner == -1:
+                min_boxes |= 1 << box
+        return BitState(self.size, drawn, max_boxes, min_boxes, self.again)
+
+    def to_list(self):
+        return bit_to_list(self.to_bit())
+
+    def copy(self):
+        state = SearchState.__new__(SearchState)
+        state.geometry = self.geometry
+        state.size = self.size
+        state.turn_again = self.turn_again
+        state.max_to_move = self.max_to_move
+        state.drawn = bytearray(self.drawn)
+        state.box_left = self.box_left.copy()
+        state.box_owner = self.box_owner.copy()
+        state.free = self.free
+        state.max_score = self.max_score
+        state.min_score = self.min_score
+        state.again = self.again
+        state.history = self.history.copy()
+        state.key = self.key
+        state.symmetry_key = self.symmetry_key
+        return state
+
+    def compute_key(self):
+        geometry = self.geometry
+        key = geometry.zobrist_score[self.max_score - self.min_score + geometry.boxes]
+        for move in geometry.moves:
+            if self.drawn[move]:
+                key ^= geometry.zobrist_moves[move]
+        if self.max_to_move:
+            key ^= geometry.zobrist_max_to_move
+        if self.again:
+            key ^= geometry.zobrist_again
+        return key
+
+    # (key, symmetry): the key of the smallest rotated/mirrored board and the symmetry that gives it
+    # the player, turn again marker and score look the same on every version of the board
+    def canonical_key(self):
+        packed = self.symmetry_key
+        lines = packed & ZOBRIST_MASK  # identity, the lines part of self.key
+        best = lines
+        best_symmetry = 0
+        for number in range(1, 8):
+            packed >>= ZOBRIST_BITS
+            if (packed & ZOBRIST_MASK) < best:
+                best = packed & ZOBRIST_MASK
+                best_symmetry = number
+        return self.key ^ lines ^ best, best_symmetry
+
+    # moves that are a rotation/mirror of an earlier move on a board that looks the same after that rotation/mirror
+    def symmetric_duplicates(self):
+        packed = self.symmetry_key
+        lines = packed & ZOBRIST_MASK
+        same = [number for number in range(1, 8) if (packed >> (ZOBRIST_BITS * number)) & ZOBRIST_MASK == lines]
+        duplicates = set()
+        for move in self.actions():
+            if move not in duplicates:
+                for number in same:
+                    if self.geometry.symmetries[number][move] != move:
+                        duplicates.add(self.geometry.symmetries[number][move])
+        return duplicates
+
+    def set_turn(self, max_player, turn_again):
+        self.max_to_move = max_player
+        self.turn_again = turn_again
+        self.again = turn_again and self.again
+        self.key = self.compute_key()
+
+    def apply(self, move):
+        geometry = self.geometry
+        if self.again:
+            # the other player won a box and goes again, this turn is only used up handing it back
+            self.again = False
+            self.history.append(-1)
+            self.max_to_move = not self.max_to_move
+            self.key ^= geometry.zobrist_again ^ geometry.zobrist_max_to_move
+            return
+
+        self.drawn[move] = 1
+        self.free -= 1
+        self.symmetry_key ^= geometry.zobrist_symmetric[move]
+        key = self.key ^ geometry.zobrist_moves[move] ^ geometry.zobrist_max_to_move
+        won = 0
+        owner = 1 if self.max_to_move else -1
+        box_left = self.box_left
+        for box in geometry.edge_boxes[move]:
+            box_left[box] -= 1
+            if box_left[box] == 0:
+                self.box_owner[box] = owner
+                won += 1
+        if won:
+            key ^= geometry.zobrist_score[self.max_score - self.min_score + geometry.boxes]
+            if self.max_to_move:
+                self.max_score += won
+            else:
+                self.min_score += won
+            key ^= geometry.zobrist_score[self.max_score - self.min_score + geometry.boxes]
+            if self.turn_again:
+                self.again = True
+                key ^= geometry.zobrist_again
+        self.key = key
+        self.history.append(move)
+        self.max_to_move = not self.max_to_move
+
+    def undo(self):
+        geometry = self.geometry
+        move = self.history.pop()
+        self.max_to_move = not self.max_to_move
+        if move < 0:
+            self.again = True
+            self.key ^= geometry.zobrist_again ^ geometry.zobrist_max_to_move
+            return
+
+        self.drawn[move] = 0
+        self.free += 1
+        self.symmetry_key ^= geometry.zobrist_symmetric[move]
+        key = self.key ^ geometry.zobrist_moves[move] ^ geometry.zobrist_max_to_move
+        won = 0
+        box_left = self.box_left
+        for box in geometry.edge_boxes[move]:
+            if box_left[box] == 0:  # this move finished the box
+                self.box_owner[box] = 0
+                won += 1
+            box_left[box] += 1
+        if won:
+            key ^= geometry.zobrist_score[self.max_score - self.min_score + geometry.boxes]
+            if self.max_to_move:
+                self.max_score -= won
+            else:
+                self.min_score -= won
+            key ^= geometry.zobrist_score[self.max_score - self.min_score + geometry.boxes]
+            if self.again:
+                self.again = False
+                key ^= geometry.zobrist_again
+        self.key = key
+
+    # copy of the state with one move applied, used by the successor functions
+    def successor(self, move, max_player, turn_again):
+        state = self.copy()
+        state.set_turn(max_player, turn_again)
+        state.apply(move)
+        return state
+
+    def actions(self):
+        drawn = self.drawn
+        return [move for move in self.geometry.moves if not drawn[move]]
+
+    def utility(self):
+        if self.free:
+            return None
+        if self.max_score > self.min_score:
+            return 1
+        elif self.max_score < self.min_score:
+            return -1
+        else:
+            return 0
+
+    def evaluate(self, evaluate):
+        weights = evaluate_weights(evaluate, self.size)
+        if weights is None:
+            return evaluate(self.to_list())
+        return weighted_evaluate(self.box_left, weights)
+
+
+# evaluate function for the representations that are not lists
+def state_evaluate(state, evaluate):
+    if type(state) is SearchState:
+        return state.evaluate(evaluate)
+    return bit_evaluate(state, evaluate)
+
+
+def to_list_rep(state):
+    if type(state) is SearchState:
+        return state.to_list()
+    elif type(state) is BitState:
+        return bit_to_list(state)
+    return state
+
+
+"""
+Min and Max Alpha Beta with current depth and eventual limit search 
+
+max_value_2/min_value_2 does not implement the additional turn after winning a box for said player
+
+max_value_2A/min_value_2A contains the additional turn after winning a box for said player
+
+Evaluate functions passed to each player 
+
+All four are now thin wrappers: the state (list, BitState or SearchState) becomes a SearchState with the player and
+the rules of the function called, and one negamax search (see negamax) does the work with apply/undo.
+Passing a SearchContext adds whatever the context has (transposition table, move ordering, ...).
+"""
+
+
+#initalized comparison values for Alpha Beta pruning
+neg_infinity = -inf
+pos_infinity = inf
+
+def max_value_2(state, max_eval, min_eval, alpha, beta, depth, limit, context=None):
+    return search_in_place(state, max_eval, min_eval, alpha, beta, depth, limit, True, False, context)
+
+
+def min_value_2(state,max_eval, min_eval, alpha, beta, depth, limit, context=None):
+    return search_in_place(state, max_eval, min_eval, alpha, beta, depth, limit, False, False, context)
+
+
+"""
+Max algorithm with additional turn after box completion
+A = Again as in turn again 
+"""
+def max_value_2A(state, max_eval, min_eval, alpha, beta, depth, limit, context=None):
+    return search_in_place(state, max_eval, min_eval, alpha, beta, depth, limit, True, True, context)
+
+
+"""
+Min algorithm with additional turn after box completion
+A = Again as in turn again
+"""
+def min_value_2A(state,max_eval, min_eval, alpha, beta, depth, limit, context=None):
+    return search_in_place(state, max_eval, min_eval, alpha, beta, depth, limit, False, True, context)
+
+"""
+Transposition Table
+
+Dots and Boxes reaches the same position through many move orders (drawing a then b or b then a).
+The table remembers what the search found for a position, keyed by SearchState.key, so it is only searched once.
+Each entry is (key, value, depth searched below it, bound, best move).
+The bound says what the value means for the alpha beta window it was searched with:
+EXACT is the value, LOWER means the value is at least this (it caused a cutoff), UPPER means at most this.
+
+The table has a fixed number of slots (key % size). replace="depth" keeps the entry that was searched deeper
+when two positions want the same slot, replace="always" lets the newest entry win.
+hits, misses and cutoffs count how often it was useful.
+"""
+
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+
+class TranspositionTable:
+
+    def __init__(self, size=1 << 16, replace="depth"):
+        if replace not in ("depth", "always"):
+            raise ValueError("unknown replacement policy: " + str(replace))
+        self.size = size
+        self.replace = replace
+        self.entries = [None] * size
+        self.hits = 0
+        self.misses = 0
+        self.cutoffs = 0  # hits that answered the node without searching it
+        self.stores = 0
+        self.overwrites = 0  # a different position was thrown out to make room
+
+    def probe(self, key):
+        entry = self.entries[key % self.size]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def store(self, key, value, depth, bound, move):
+        slot = key % self.size
+        old = self.entries[slot]
+        if old is not None and old[0] != key:
+            if self.replace == "depth" and old[2] > depth:
+                return
+            self.overwrites += 1
+        self.entries[slot] = (key, value, depth, bound, move)
+        self.stores += 1
+
+    def clear(self):
+        self.entries = [None] * self.size
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "cutoffs": self.cutoffs,
+                "stores": self.stores, "overwrites": self.overwrites}
+
+    def clear_counts(self):
+        self.hits = 0
+        self.misses = 0
+        self.cutoffs = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    # add the counters of a copy of this table that was used somewhere else (another process)
+    def add_counts(self, other):
+        self.hits += other.hits
+        self.misses += other.misses
+        self.cutoffs += other.cutoffs
+        self.stores += other.stores
+        self.overwrites += other.overwrites
+
+
+"""
+Evaluation Cache
+
+The search only calls an evaluate function at the depth limit (interior nodes never evaluate), but the same frontier
+positions come back in sibling subtrees (a then b, b then a) and on the next move, one depth further down.
+EvaluationCache remembers what an evaluate function gave for a position, keyed by the lines drawn
+(the identity part of SearchState.symmetry_key, not the score or the player, the evaluate functions only look at
+the moves left on each box) and the evaluate function. It holds at most size values and throws out the one
+used longest ago (an OrderedDict in use order). Evaluate functions without weights (see evaluate_weights)
+are not cached, they can look at more than the lines. hits, misses and evictions count how often it was useful.
+SearchContext(eval_cache=EvaluationCache()) uses it for every leaf, and for the batched frontier (only the
+children it does not have go to frontier_values). Values come back bit for bit, the board is the same board.
+
+It is off by default: the evaluate functions here are already a lookup per box (evaluate_weights), 1 to 3 us,
+and a hit still costs about 0.9 us, so even at the hit rates it gets (30-40% of the leaves, 60-70% with the
+batched frontier) the misses make whole games slower (5 X 5, limit 4: 8.2s without, 8.7s with).
+It pays for itself with an evaluate function that costs more per position.
+"""
+
+
+class EvaluationCache:
+
+    def __init__(self, size=1 << 16):
+        self.size = size
+        self.values = OrderedDict()  # lines key ^ salt of the evaluate function: value, used longest ago first
+        self.salts = dict()  # evaluate function: (random salt, weights), (None, None) when it can not be cached
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # keys are ints (lines key ^ a salt for each evaluate function), cheaper to hash than (key, function) tuples
+    def salt(self, evaluate, size):
+        found = self.salts.get((evaluate, size))
+        if found is None:
+            weights = evaluate_weights(evaluate, size)
+            salt = None if weights is None else random.Random(evaluate.__name__ + str(size)).getrandbits(ZOBRIST_BITS)
+            found = (salt, weights)
+            self.salts[(evaluate, size)] = found
+        return found
+
+    def store(self, key, value):
+        values = self.values
+        values[key] = value
+        if len(values) > self.size:
+            values.popitem(last=False)
+            self.evictions += 1
+
+    # state.evaluate(evaluate), from the cache when it has it
+    def evaluate(self, state, evaluate):
+        salt, weights = self.salt(evaluate, state.size)
+        if salt is None:
+            return state.evaluate(evaluate)
+        key = state.symmetry_key & ZOBRIST_MASK ^ salt
+        value = self.values.get(key)
+        if value is not None:
+            self.hits += 1
+            self.values.move_to_end(key)
+            return value
+        self.misses += 1
+        value = weighted_evaluate(state.box_left, weights)
+        self.store(key, value)
+        return value
+
+    # frontier_values with the children the cache has taken from it, None when it can not be batched
+    def frontier(self, state, moves, evaluate):
+        salt, weights = self.salt(evaluate, state.size)
+        if salt is None:
+            return None
+        lines = state.symmetry_key & ZOBRIST_MASK ^ salt
+        zobrist_moves = state.geometry.zobrist_moves
+        values = self.values
+        found = dict()
+        missing = []
+        for move in moves:
+            key = lines ^ zobrist_moves[move]
+            value = values.get(key)
+            if value is None:
+                missing.append(move)
+            else:
+                values.move_to_end(key)
+                found[move] = value
+        self.hits += len(found)
+        self.misses += len(missing)
+        if missing:
+            computed = frontier_values(state, missing, evaluate)
+            if computed is None:  # no NumPy, make each child
+                computed = dict()
+                for move in missing:
+                    state.apply(move)
+                    computed[move] = weighted_evaluate(state.box_left, weights)
+                    state.undo()
+            for move in missing:
+                self.store(lines ^ zobrist_moves[move], computed[move])
+            found.update(computed)
+        return found
+
+    def clear(self):
+        self.values = OrderedDict()
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else None
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "hit_rate": self.hit_rate()}
+
+    def clear_counts(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # add the counters of a copy of this cache that was used somewhere else (another process)
+    def add_counts(self, other):
+        self.hits += other.hits
+        self.misses += other.misses
+        self.evictions += other.evictions
+
+
+"""
+Search Stats
+
+Where the time of a search goes, collected by the in place search when the SearchContext has one (stats=True):
+    nodes        - positions searched at each depth (nodes[0] is the number of searches)
+    leaves       - positions scored by an evaluate function at the depth limit
+    terminals    - finished games found by the search (scored by utility), tablebase and chain/loop endgame positions
+    cutoffs      - alpha beta cutoffs by the number of the move that caused them (cutoffs[0]: the first move tried)
+    root_seconds - (move, seconds) for every first move a search tried, the wall time of searching that move
+    move_seconds - wall time of every move the simulations searched for
+    games        - games played while collecting
+play_games keeps one SearchStats per game in context.game_stats and adds them all up in context.stats
+for the matchup. Without stats the search only pays one extra test per position.
+"""
+
+
+class SearchStats:
+
+    def __init__(self):
+        self.nodes = []
+        self.leaves = 0
+        self.terminals = 0
+        self.cutoffs = []
+        self.root_seconds = []
+        self.move_seconds = []
+        self.games = 0
+
+    def count_node(self, depth):
+        nodes = self.nodes
+        while len(nodes) <= depth:
+            nodes.append(0)
+        nodes[depth] += 1
+
+    def count_cutoff(self, move_number):
+        cutoffs = self.cutoffs
+        while len(cutoffs) <= move_number:
+            cutoffs.append(0)
+        cutoffs[move_number] += 1
+
+    # nodes of every depth grow by about this much per depth
+    def branching_factor(self):
+        if len(self.nodes) < 2 or not self.nodes[0]:
+            return None
+        return (self.nodes[-1] / self.nodes[0]) ** (1 / (len(self.nodes) - 1))
+
+    # share of the cutoffs caused by the first move tried, close to 1 means the move ordering is good
+    def first_move_cutoffs(self):
+        if not self.cutoffs:
+            return None
+        return self.cutoffs[0] / sum(self.cutoffs)
+
+    def add(self, other):
+        for depth, count in enumerate(other.nodes):
+            while len(self.nodes) <= depth:
+                self.nodes.append(0)
+            self.nodes[depth] += count
+        for move_number, count in enumerate(other.cutoffs):
+            while len(self.cutoffs) <= move_number:
+                self.cutoffs.append(0)
+            self.cutoffs[move_number] += count
+        self.leaves += other.leaves
+        self.terminals += other.terminals
+        self.root_seconds.extend(other.root_seconds)
+        self.move_seconds.extend(other.move_seconds)
+        self.games += other.games
+
+    def summary(self):
+        moves = len(self.move_seconds)
+        return dict(games=self.games, nodes=sum(self.nodes), nodes_per_depth=list(self.nodes), leaves=self.leaves,
+                    terminals=self.terminals, cutoffs=sum(self.cutoffs), cutoffs_per_move_number=list(self.cutoffs),
+                    first_move_cutoffs=self.first_move_cutoffs(), branching_factor=self.branching_factor(),
+                    root_moves=len(self.root_seconds),
+                    slowest_root_move=max((seconds for move, seconds in self.root_seconds), default=None),
+                    moves=moves, seconds=sum(self.move_seconds),
+                    seconds_per_move=sum(self.move_seconds) / moves if moves else None,
+                    slowest_move=max(self.move_seconds, default=None))
+
+
+"""
+Search Context
+
+Everything extra a search can use, passed down the in place search as one object.
+nodes counts the positions searched (also when there is no table, for comparing searches).
+new_game is called by the game simulations before every game so one game never depends on another.
+
+symmetry=True keys the table on SearchState.canonical_key, so a board and its rotations/mirrors share one entry
+(best moves are stored for the canonical board and turned back), and skips first moves that are a
+rotation/mirror of an earlier first move on a symmetric board (the empty 3 X 3 board has only 4 different first moves out of 24).
+
+ordering=True tries the moves most likely to cause a cutoff first (see order_moves), using the killer moves
+(last moves that caused a cutoff at each depth) and the history table (how much each move has caused cutoffs).
+
+The budget (start_budget) stops a search after a number of nodes or seconds by raising SearchTimeout,
+it is only checked every few hundred nodes so an unlimited search pays one comparison per node.
+root_move is searched first at the first move (iterative deepening passes the last depth's best move).
+stats=True collects a SearchStats in stats (and one per game in game_stats, see play_games).
+"""
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+
+class SearchContext:
+
+    def __init__(self, table=None, symmetry=True, ordering=True, batch=True, stats=False, tablebase=None,
+                 endgame=False, pvs=True, book=None, eval_cache=None):
+        self.table = table
+        self.symmetry = symmetry
+        self.ordering = ordering
+        self.batch = batch  # score the children one move above the depth limit together (needs NumPy)
+        self.stats = SearchStats() if stats else None
+        self.tablebase = tablebase  # exact values of turn again endgames (see Tablebase)
+        self.endgame = endgame  # solve turn again chain and loop endgames exactly (see loony_endgame)
+        self.pvs = pvs  # principal variation (null window) search, see negamax
+        self.book = book  # best first moves, looked up instead of searched (see OpeningBook)
+        self.eval_cache = eval_cache  # evaluate function values of the leaves (see EvaluationCache)
+        self.game_stats = []
+        self.killers = dict()  # depth: [newest killer, older killer]
+        self.history = dict()  # move: score
+        self.nodes = 0
+        self.root_move = None
+        self.horizon_hit = False  # an evaluate function was used, so a deeper search could change the answer
+        self.check_at = inf  # node count of the next budget check
+        self.node_limit = inf
+        self.deadline = inf
+
+    def start_budget(self, time_budget=None, node_budget=None):
+        self.deadline = inf if time_budget is None else time.perf_counter() + time_budget
+        self.node_limit = inf if node_budget is None else self.nodes + node_budget
+        self.check_at = self.nodes
+        self.check_budget()
+
+    def stop_budget(self):
+        self.check_at = inf
+        self.node_limit = inf
+        self.deadline = inf
+
+    def check_budget(self):
+        if self.nodes >= self.node_limit or time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
+        self.check_at = min(self.nodes + 256, self.node_limit)
+
+    def new_game(self):
+        if self.table is not None:
+            self.table.clear()
+        self.killers = dict()
+        self.history = dict()
+
+    def clear_counts(self):
+        self.nodes = 0
+        if self.table is not None:
+            self.table.clear_counts()
+        if self.eval_cache is not None:
+            self.eval_cache.clear_counts()
+        if self.stats is not None:
+            self.stats = SearchStats()
+        self.game_stats = []
+
+    # add the counters of a copy of this context that searched somewhere else (another process)
+    def add_counts(self, other):
+        self.nodes += other.nodes
+        if self.table is not None and other.table is not None:
+            self.table.add_counts(other.table)
+        if self.eval_cache is not None and other.eval_cache is not None:
+            self.eval_cache.add_counts(other.eval_cache)
+        if self.stats is not None and other.stats is not None:
+            self.stats.add(other.stats)
+        self.game_stats.extend(other.game_stats)
+
+
+"""
+Move Ordering
+
+actions_in gives moves in index order, but alpha beta cuts off sooner when the best move is searched first.
+order_moves sorts moves into groups:
+    captures - finish a box (a box next to it has one move left)
+    killer moves - the last two moves that caused a cutoff at this depth
+    safe moves - do not leave a box with three sides drawn for the other player
+    sacrifices - leave a box with three sides drawn (a box next to it has two moves left)
+Inside each group moves with a higher history score come first, then index order.
+first_move (the best move the table remembers) always goes in front.
+
+Killers go ahead of the safe/sacrifice split because the evaluate functions sometimes like sacrifices
+(snatch_evaluate counts every box with one move left), keeping them behind every safe move searched more nodes.
+"""
+
+
+# free moves of a state in three groups, each in index order: captures, safe moves, sacrifices
+# (order_moves and the Monte Carlo rollouts start from these)
+def move_groups(state):
+    captures = []
+    safe = []
+    sacrifices = []
+    drawn = state.drawn
+    box_left = state.box_left
+    edge_boxes = state.geometry.edge_boxes
+    for move in state.geometry.moves:
+        if drawn[move]:
+            continue
+        fewest = 4
+        for box in edge_boxes[move]:
+            if box_left[box] < fewest:
+                fewest = box_left[box]
+        if fewest == 1:
+            captures.append(move)
+        elif fewest == 2:
+            sacrifices.append(move)
+        else:
+            safe.append(move)
+    return captures, safe, sacrifices
+
+
+def order_moves(state, context, depth, first_move=None):
+    captures, safe, sacrifices = move_groups(state)
+    killer_moves = []
+    for killer in context.killers.get(depth, ()):
+        if killer in safe:
+            safe.remove(killer)
+            killer_moves.append(killer)
+        elif killer in sacrifices:
+            sacrifices.remove(killer)
+            killer_moves.append(killer)
+    killer_moves.sort()  # index order, like the other groups
+    if first_move is not None:
+        for group in (captures, killer_moves, safe, sacrifices):
+            if first_move in group:
+                group.remove(first_move)
+                break
+
+    history = context.history
+    if history:
+        def rank(move):
+            return -history.get(move, 0)
+        captures.sort(key=rank)
+        killer_moves.sort(key=rank)
+        safe.sort(key=rank)
+        sacrifices.sort(key=rank)
+    if first_move is not None:
+        return [first_move] + captures + killer_moves + safe + sacrifices
+    return captures + killer_moves + safe + sacrifices
+
+
+# a move caused a cutoff: remember it as a killer for this depth and add to its history score
+# (captures are searched first anyway, so they are left out)
+def record_cutoff(state, context, depth, remaining, move):
+    for box in state.geometry.edge_boxes[move]:
+        if state.box_left[box] == 1:
+            return
+    killers = context.killers.get(depth)
+    if killers is None:
+        context.killers[depth] = [move, None]
+    elif killers[0] != move:
+        killers[1] = killers[0]
+        killers[0] = move
+    context.history[move] = context.history.get(move, 0) + remaining * remaining
+
+
+"""
+Batched Frontier Evaluation
+
+One move above the depth limit every child is a leaf, and the evaluate functions only look at the moves left on each box.
+frontier_values builds a (children x boxes) matrix of moves left with NumPy and scores every child in one pass,
+adding the weights box by box (the order weighted_evaluate adds them), so the values are identical.
+The first child is still made on its own (it is the one most likely to cause a cutoff, and then the rest are never
+scored), the children after it are scored together when there are at least BATCH_MIN_CHILDREN moves left.
+This is on by default, also for max_value_2 and friends without a SearchContext (SearchContext(batch=False) turns it off).
+NumPy is optional, without it (or for an evaluate function with no weights) the search makes every child as before.
+Children the tablebase or the endgame solver could know exactly are never scored this way (see exact_children).
+frontier_mismatches checks that the batched and the plain search agree on random turn again positions.
+"""
+
+# fewest moves left worth scoring together, below it making each child is faster than the NumPy calls
+BATCH_MIN_CHILDREN = 8
+
+_numpy = None
+
+
+def numpy_module():
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+        except ImportError:
+            numpy = False
+        _numpy = numpy
+    return _numpy or None
+
+
+# size: (cells x boxes matrix, 1 where the move at that index is a side of the box)
+_side_matrices = dict()
+
+
+def side_matrix(size):
+    sides = _side_matrices.get(size)
+    if sides is None:
+        np = numpy_module()
+        geometry = board_geometry(size)
+        sides = np.zeros((geometry.cells, geometry.boxes), dtype=np.intp)
+        for move in geometry.moves:
+            sides[move, list(geometry.edge_boxes[move])] = 1
+        _side_matrices[size] = sides
+    return sides
+
+
+# move: value of the state after the move, for every move in moves, or None when it can not be batched
+def frontier_values(state, moves, evaluate):
+    np = numpy_module()
+    if np is None:
+        return None
+    weights = evaluate_weights(evaluate, state.size)
+    if weights is None:
+        return None
+
+    counts = np.array(state.box_left, dtype=np.intp) - side_matrix(state.size)[moves]  # children x boxes
+    scores = np.array(weights, dtype=np.float64)[counts]
+    # cumsum adds one box after another, the same order as weighted_evaluate (sum could add them pairwise)
+    values = np.cumsum(scores, axis=1)[:, -1]
+    return dict(zip(moves, values.tolist()))
+
+
+# frontier_mismatches : how many of positions random turn again positions get a different value from the batched
+# and the plain search, both with SearchContext(**settings) (for example tablebase=Tablebase(file_name))
+def frontier_mismatches(size_of_game, positions=300, limit=2, seed=0, max_eval=action_evaluate_max,
+                        min_eval=action_evaluate_min, **settings):
+    rng = game_random(seed, size_of_game)
+    lines = len(board_geometry(size_of_game).moves)
+    mismatches = 0
+    for position in range(positions):
+        state = SearchState(size_of_game, turn_again=True, max_to_move=True)
+        for action in random_opening(size_of_game, True, rng.randint(lines // 2, lines - 1), rng):
+            state.apply(action)
+        values = [search_in_place(state, max_eval, min_eval, -1, +1, 0, limit, state.max_to_move, True,
+                                  SearchContext(batch=batch, **settings))[0] for batch in (True, False)]
+        if values[0] != values[1]:
+            mismatches += 1
+    return mismatches
+
+
+"""
+Endgame Tablebase (turn again rules)
+
+With the turn again rule the best number of boxes the player to move can still win over the other player
+only depends on the lines left, not on the score or on who is to move: a move that finishes boxes gets them
+and the same player goes on, any other move hands the same lines to the other player.
+    remaining(no lines left) = 0
+    remaining(lines) = best over each line of: won + remaining(lines - line)  if the line finishes won > 0 boxes
+                                                -remaining(lines - line)      otherwise
+build_tablebase works this out backwards from the end of the game, for every set of up to coverage lines left,
+with NumPy (one level of lines left at a time), and writes it to a file:
+    header  - b"DBTB", format version, size of the board, coverage (TABLEBASE_HEADER)
+    values  - one signed byte per set of lines left, the sets with 0 lines left first, then 1, 2, ... coverage.
+              Inside a level a set is at its combinadic rank: lines numbered 0.. in the order of BoardGeometry.moves,
+              the lines left c1 < c2 < .. < ck are at comb(c1, 1) + comb(c2, 2) + .. + comb(ck, k)
+Tablebase memory maps the file (only the pages a search touches are read) and gives the exact utility of
+a SearchState. The in place search probes it (SearchContext(tablebase=...)) once coverage or fewer lines are left,
+for every position but the first move (which still needs a move), so max_value_2A/min_value_2A with that
+context play the end of the game perfectly.
+"""
+
+TABLEBASE_HEADER = struct.Struct("<4sHHH")
+TABLEBASE_MAGIC = b"DBTB"
+TABLEBASE_VERSION = 1
+
+
+# sets of up to coverage lines left on the board, so tablebase file size in bytes after the header
+def tablebase_entries(size, coverage):
+    lines = len(board_geometry(size).moves)
+    return sum(math.comb(lines, left) for left in range(coverage + 1))
+
+
+def build_tablebase(size, coverage, file_name):
+    np = numpy_module()
+    if np is None:
+        raise ImportError("build_tablebase needs NumPy")
+    geometry = board_geometry(size)
+    lines = len(geometry.moves)
+    if not 0 <= coverage <= lines:
+        raise ValueError("coverage must be between 0 and %d lines on a %d X %d board" % (lines, size, size))
+    line_numbers = {move: line for line, move in enumerate(geometry.moves)}
+    box_lines = np.array([[line_numbers[move] for move in edges] for edges in geometry.box_edges], dtype=np.intp)
+    line_boxes = np.full((lines, 2), geometry.boxes, dtype=np.intp)  # the boxes of each line, boxes = no box
+    for line, move in enumerate(geometry.moves):
+        line_boxes[line, :len(geometry.edge_boxes[move])] = geometry.edge_boxes[move]
+    binomials = np.array([[math.comb(n, k) for k in range(coverage + 1)] for n in range(lines)], dtype=np.int64)
+
+    with open(file_name, "wb") as stream:
+        stream.write(TABLEBASE_HEADER.pack(TABLEBASE_MAGIC, TABLEBASE_VERSION, size, coverage))
+        before = np.zeros(1, dtype=np.int8)  # no lines left, nothing left to win
+        stream.write(before.tobytes())
+        for left in range(1, coverage + 1):
+            count = math.comb(lines, left)
+            # every set of left lines, in lexicographic order (rows of line numbers, smallest first)
+            combinations = np.fromiter(itertools.chain.from_iterable(itertools.combinations(range(lines), left)),
+                                       dtype=np.intp, count=count * left).reshape(count, left)
+            columns = np.arange(left)
+            ranks = binomials[combinations, columns + 1].sum(axis=1)
+            free = np.zeros((count, lines), dtype=np.int8)
+            free[np.arange(count)[:, None], combinations] = 1
+            box_free = np.zeros((count, geometry.boxes + 1), dtype=np.int8)  # lines left on each box (and no box)
+            box_free[:, :geometry.boxes] = free[:, box_lines].sum(axis=2)
+            best = np.full(count, -128, dtype=np.intp)
+            for drawn in range(left):
+                # rank of the lines left after drawing line number drawn: the lines after it move down one place
+                child = (binomials[combinations[:, :drawn], columns[:drawn] + 1].sum(axis=1) +
+                         binomials[combinations[:, drawn + 1:], columns[drawn + 1:]].sum(axis=1))
+                line = combinations[:, drawn]
+                boxes = line_boxes[line]
+                won = (box_free[np.arange(count)[:, None], boxes] == 1).sum(axis=1)
+                after = before[child].astype(np.intp)
+                best = np.maximum(best, np.where(won > 0, won + after, -after))
+            values = np.empty(count, dtype=np.int8)
+            values[ranks] = best
+            stream.write(values.tobytes())
+            before = values
+
+
+class Tablebase:
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.stream = open(file_name, "rb")
+        self.map = mmap.mmap(self.stream.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, size, coverage = TABLEBASE_HEADER.unpack_from(self.map)
+        if magic != TABLEBASE_MAGIC or version != TABLEBASE_VERSION:
+            raise ValueError(file_name + " is not a tablebase file")
+        if len(self.map) != TABLEBASE_HEADER.size + tablebase_entries(size, coverage):
+            raise ValueError(file_name + " is cut short")
+        self.size = size
+        self.coverage = coverage
+        self.values = memoryview(self.map)[TABLEBASE_HEADER.size:].cast("b")
+        geometry = board_geometry(size)
+        self.moves = geometry.moves
+        lines = len(self.moves)
+        self.offsets = [0]  # where each number of lines left starts
+        for left in range(coverage):
+            self.offsets.append(self.offsets[-1] + math.comb(lines, left))
+        self.binomials = [[math.comb(n, k) for k in range(coverage + 1)] for n in range(lines)]
+
+    # the memory map can not go to another process, the file is opened again there
+    def __getstate__(self):
+        return self.file_name
+
+    def __setstate__(self, file_name):
+        self.__init__(file_name)
+
+    def close(self):
+        self.values.release()
+        self.map.close()
+        self.stream.close()
+
+    # boxes the player to move can still win over the other player, drawn is 1 for every line drawn
+    # (indexed like the list representation), at most coverage lines can be left
+    def remaining(self, drawn):
+        binomials = self.binomials
+        rank = 0
+        left = 0
+        for line, move in enumerate(self.moves):
+            if not drawn[move]:
+                left += 1
+                rank += binomials[line][left]
+        return self.values[self.offsets[left] + rank]
+
+    # exact utility of a SearchState with coverage or fewer lines left
+    def utility(self, state):
+        remaining = self.remaining(state.drawn)
+        if state.max_to_move == state.again:  # min makes the next move (max only hands the turn back)
+            remaining = -remaining
+        difference = state.max_score - state.min_score + remaining
+        if difference > 0:
+            return 1
+        elif difference < 0:
+            return -1
+        return 0
+
+
+"""
+Chain and Loop Endgames (turn again rules)
+
+Once every box is finished or has exactly 2 lines left there are no safe moves and nothing to take:
+every line left is part of a chain (boxes in a row, from the edge of the board to the edge) or a loop
+(boxes in a ring), and any move opens one of them. loony_components finds them.
+
+With the turn again rule the other player then takes what was opened, or keeps control by taking all but the last
+2 boxes of a chain (4 of a loop) and giving those to the opener, who has to open the next one (double dealing).
+loony_value works out the best box difference for the player who has to open, over the lengths only:
+    opening a chain of length k:   the other player gets the best of  k + value(rest)  and  k - 4 - value(rest)
+                                   (chains of 1 or 2 can not be double dealt, a chain of 2 is opened in the middle)
+    opening a loop of length k:    the other player gets the best of  k + value(rest)  and  k - 8 - value(rest)
+Values are remembered per (chains, loops), so a search or a game pays for each set of lengths once.
+loony_endgame turns that into (utility, move) for a SearchState, the move opens the best component the right way.
+The in place search uses it as an exact answer (SearchContext(endgame=True)), at every depth including the first move.
+"""
+
+# (chain lengths, loop lengths), both sorted: box difference for the player who has to open one
+_loony_values = dict()
+
+
+# ([(chain length, lines from one end to the other)], [(loop length, lines)]) or None if some box has 1, 3 or 4 lines left
+def loony_components(state):
+    box_left = state.box_left
+    if 1 in box_left or 3 in box_left or 4 in box_left:
+        return None
+    geometry = state.geometry
+    drawn = state.drawn
+    free_lines = [[move for move in edges if not drawn[move]] for edges in geometry.box_edges]
+    seen = [False] * geometry.boxes
+    chains = []
+    loops = []
+    # chains first, walked from the box at one end (a box with a line on the edge of the board)
+    for start in range(geometry.boxes):
+        if seen[start] or box_left[start] != 2:
+            continue
+        ends = [move for move in free_lines[start] if len(geometry.edge_boxes[move]) == 1]
+        if not ends:
+            continue
+        lines = [ends[0]]
+        box = start
+        while box is not None:
+            seen[box] = True
+            line = free_lines[box][0] if free_lines[box][0] != lines[-1] else free_lines[box][1]
+            lines.append(line)
+            box = None
+            for next_box in geometry.edge_boxes[line]:
+                if not seen[next_box]:
+                    box = next_box
+        chains.append((len(lines) - 1, lines))
+    # what is left are loops
+    for start in range(geometry.boxes):
+        if seen[start] or box_left[start] != 2:
+            continue
+        lines = []
+        box = start
+        while box is not None:
+            seen[box] = True
+            line = free_lines[box][0] if not lines or free_lines[box][0] != lines[-1] else free_lines[box][1]
+            lines.append(line)
+            box = None
+            for next_box in geometry.edge_boxes[line]:
+                if not seen[next_box]:
+                    box = next_box
+        loops.append((len(lines), lines))
+    return chains, loops
+
+
+def loony_value(chains, loops):
+    key = (chains, loops)
+    if key in _loony_values:
+        return _loony_values[key]
+    if not chains and not loops:
+        return 0
+    best = -inf
+    for number, length in enumerate(chains):
+        if number and chains[number - 1] == length:
+            continue  # same length as the last one, same value
+        rest = loony_value(chains[:number] + chains[number + 1:], loops)
+        taken = length + rest
+        if length > 2:
+            taken = max(taken, length - 4 - rest)
+        best = max(best, -taken)
+    for number, length in enumerate(loops):
+        if number and loops[number - 1] == length:
+            continue
+        rest = loony_value(chains, loops[:number] + loops[number + 1:])
+        best = max(best, -max(length + rest, length - 8 - rest))
+    _loony_values[key] = best
+    return best
+
+
+# (utility, move) of a SearchState where every move opens a chain or a loop, None for any other state
+def loony_endgame(state):
+    components = loony_components(state)
+    if components is None:
+        return None
+    chains, loops = components
+    chain_lengths = tuple(sorted(length for length, lines in chains))
+    loop_lengths = tuple(sorted(length for length, lines in loops))
+    value = loony_value(chain_lengths, loop_lengths)
+
+    if state.again:
+        move = state.actions()[0]  # only handing the turn back
+    else:
+        move = None
+        for length, lines in chains:
+            rest = loony_value(tuple(sorted(other for other, other_lines in chains if other_lines is not lines)),
+                               loop_lengths)
+            taken = length + rest
+            if length > 2:
+                taken = max(taken, length - 4 - rest)
+            if -taken == value:
+                move = lines[1] if length == 2 else lines[0]  # a chain of 2 in the middle, so it can not be double dealt
+                break
+        if move is None:
+            for length, lines in loops:
+                rest = loony_value(chain_lengths, tuple(sorted(other for other, other_lines in loops
+                                                               if other_lines is not lines)))
+                if -max(length + rest, length - 8 - rest) == value:
+                    move = lines[0]
+                    break
+
+    if state.max_to_move == state.again:  # min opens the next one
+        value = -value
+    difference = state.max_score - state.min_score + value
+    if difference > 0:
+        return (1, move)
+    elif difference < 0:
+        return (-1, move)
+    return (0, move)
+
+
+"""
+Opening Book
+
+The first moves on an empty board are the slowest to search (the most moves to pick from) and they are the same
+in every game. build_opening_book searches every position of the first plies moves once, limit deep, and writes
+the best move of each one to a file. Positions are stored once per rotation/mirror (SearchState.canonical_key),
+the move on the smallest board of the symmetry class, so one entry answers for all eight versions of a position.
+    header  - b"DBOB", format version, size of the board, turn again (0 or 1), plies, limit, slots,
+              then the names of the max and min evaluate functions it was searched with (OPENING_BOOK_HEADER)
+    slots   - a hash table of (key, move, value for max) (OPENING_BOOK_ENTRY), a power of two slots at most half full,
+              a key goes in slot key % slots or the next free one after it (key 0 is an empty slot)
+OpeningBook only opens the file (a memory map) at its first lookup, and a lookup reads one or two slots.
+The search asks the book at the first move (SearchContext(book=...)), only for the size, rules and evaluate
+functions the book was built with. Once the game has left the book, lookup gives None and the search runs as before.
+The book move can be a different one of several equally good moves than the search would have picked, and as the
+book searched another rotation/mirror of the position, the value can differ in the last bits (the boxes get added up
+in another order).
+"""
+
+OPENING_BOOK_HEADER = struct.Struct("<4sHHBBHI32s32s")
+OPENING_BOOK_ENTRY = struct.Struct("<QHd")
+OPENING_BOOK_MAGIC = b"DBOB"
+OPENING_BOOK_VERSION = 1
+
+
+# the states of the first plies moves from the empty board, one for each position up to rotations/mirrors
+# max moves first with the turn again rule, min without it (like play_game)
+def opening_positions(size, turn_again, plies):
+    start = SearchState(size, turn_again, turn_again)
+    positions = dict()  # canonical key: state
+    level = [start]
+    for ply in range(plies):
+        next_level = []
+        for state in level:
+            if state.utility() is not None:
+                continue
+            if state.again:  # not a choice, hand the turn back and the position after it goes in the book
+                state = state.copy()
+                state.apply(-1)
+            key = state.canonical_key()[0]
+            if key in positions:
+                continue
+            positions[key] = state
+            for move in state.actions():
+                child = state.copy()
+                child.apply(move)
+                next_level.append(child)
+        level = next_level
+    return list(positions.values())
+
+
+def _search_opening(arguments):
+    bit_state, turn_again, max_to_move, max_eval, min_eval, limit = arguments
+    state = SearchState.from_bit(bit_state, turn_again, max_to_move)
+    return in_place_value(state, max_eval, min_eval, -1, +1, 0, limit, SearchContext(TranspositionTable()))
+
+
+def build_opening_book(size, turn_again, plies, file_name, max_eval=action_evaluate_max,
+                       min_eval=action_evaluate_min, limit=5, workers=None):
+    from concurrent.futures import ProcessPoolExecutor
+    positions = opening_positions(size, turn_again, plies)
+    tasks = [(state.to_bit(), turn_again, state.max_to_move, max_eval, min_eval, limit) for state in positions]
+    if workers is None or workers <= 1:
+        results = [_search_opening(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_search_opening, tasks))
+
+    slots = 1
+    while slots < 2 * len(positions):
+        slots *= 2
+    table = bytearray(OPENING_BOOK_ENTRY.size * slots)
+    for state, (value, move) in zip(positions, results):
+        key, symmetry = state.canonical_key()
+        key = key or 1  # 0 marks an empty slot
+        slot = key % slots
+        while OPENING_BOOK_ENTRY.unpack_from(table, slot * OPENING_BOOK_ENTRY.size)[0]:
+            slot = (slot + 1) % slots
+        OPENING_BOOK_ENTRY.pack_into(table, slot * OPENING_BOOK_ENTRY.size, key,
+                                     state.geometry.symmetries[symmetry][move], value)
+    with open(file_name, "wb") as stream:
+        stream.write(OPENING_BOOK_HEADER.pack(OPENING_BOOK_MAGIC, OPENING_BOOK_VERSION, size, turn_again, plies,
+                                              limit, slots, max_eval.__name__.encode(), min_eval.__name__.encode()))
+        stream.write(table)
+    return len(positions)
+
+
+class OpeningBook:
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.map = None  # opened at the first lookup
+
+    # the memory map can not go to another process, the file is opened again there
+    def __getstate__(self):
+        return self.file_name
+
+    def __setstate__(self, file_name):
+        self.__init__(file_name)
+
+    def open(self):
+        self.stream = open(self.file_name, "rb")
+        self.map = mmap.mmap(self.stream.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, size, turn_again, plies, limit, slots, max_name, min_name = \
+            OPENING_BOOK_HEADER.unpack_from(self.map)
+        if magic != OPENING_BOOK_MAGIC or version != OPENING_BOOK_VERSION:
+            raise ValueError(self.file_name + " is not an opening book file")
+        if len(self.map) != OPENING_BOOK_HEADER.size + slots * OPENING_BOOK_ENTRY.size:
+            raise ValueError(self.file_name + " is cut short")
+        self.size = size
+        self.turn_again = bool(turn_again)
+        self.plies = plies
+        self.limit = limit
+        self.slots = slots
+        self.max_name = max_name.rstrip(b"\0").decode()
+        self.min_name = min_name.rstrip(b"\0").decode()
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.stream.close()
+            self.map = None
+
+    # (value, move) for a SearchState in the book, searched with these evaluate functions, else None
+    def lookup(self, state, max_eval, min_eval):
+        if self.map is None:
+            self.open()
+        if state.size != self.size or state.turn_again != self.turn_again or state.again \
+                or getattr(max_eval, "__name__", None) != self.max_name \
+                or getattr(min_eval, "__name__", None) != self.min_name:
+            return None
+        key, symmetry = state.canonical_key()
+        key = key or 1
+        slot = key % self.slots
+        while True:
+            stored, move, value = OPENING_BOOK_ENTRY.unpack_from(self.map, OPENING_BOOK_HEADER.size +
+                                                                  slot * OPENING_BOOK_ENTRY.size)
+            if stored == key:
+                return (value, state.geometry.inverse_symmetries[symmetry][move])
+            if not stored:
+                return None
+            slot = (slot + 1) % self.slots
+
+
+"""
+In place alpha beta (one negamax for max and min, the player comes from state.max_to_move)
+
+Every child is made with state.apply(move) and taken back with state.undo(), so no state is copied. Evaluate
+functions are only called at the depth limit. negamax returns values for the player to move, so min's values
+are max_eval's flipped; in_place_value turns them back into values for max. After the first child, the rest are
+searched with a null window first (principal variation search) and again with the full window only if they beat it.
+When the other player gets to go again there is only one child: the turn handed back (the first move is reported,
+every move gives the same state in the list version).
+"""
+
+
+# the SearchState a search walks, for any representation
+# the function called decides the player and the rules, like it does for the list representation
+# copy=True leaves a SearchState that is passed in as it was
+def as_search_state(state, max_player, turn_again, copy=False):
+    if type(state) is SearchState:
+        search_state = state.copy() if copy else state
+    elif type(state) is BitState:
+        search_state = SearchState.from_bit(state, turn_again, max_player)
+    else:
+        search_state = SearchState.from_list(state, turn_again, max_player)
+    search_state.set_turn(max_player, turn_again)
+    return search_state
+
+
+def search_in_place(state, max_eval, min_eval, alpha, beta, depth, limit, max_player, turn_again, context=None):
+    search_state = as_search_state(state, max_player, turn_again)
+    if depth == 0 and context is not None and context.book is not None:
+        found = context.book.lookup(search_state, max_eval, min_eval)
+        if found is not None:
+            return found
+    return in_place_value(search_state, max_eval, min_eval, alpha, beta, depth, limit, context)
+
+
+# (value, move) with the value for max like max_value_2 and friends, searched by negamax
+def in_place_value(state, max_eval, min_eval, alpha, beta, depth, limit, context=None):
+    if state.max_to_move:
+        return negamax(state, max_eval, min_eval, alpha, beta, depth, limit, context)
+    value, move = negamax(state, max_eval, min_eval, -beta, -alpha, depth, limit, context)
+    return (-value, move)
+
+
+# whether the children of state may get their exact value (tablebase, endgame solver) instead of an evaluate function
+def exact_children(state, context):
+    if not state.turn_again:
+        return False
+    if context.endgame:
+        return True  # any child could be a chain or loop endgame
+    tablebase = context.tablebase
+    return tablebase is not None and state.size == tablebase.size and state.free - 1 <= tablebase.coverage
+
+
+# (value, move) with the value for the player to move (max's value, or minus min's value)
+def negamax(state, max_eval, min_eval, alpha, beta, depth, limit, context=None):
+    sign = 1 if state.max_to_move else -1
+    stats = None
+    if context is not None:
+        context.nodes += 1
+        if context.nodes >= context.check_at:
+            context.check_budget()
+        stats = context.stats
+        if stats is not None:
+            stats.count_node(depth)
+    check_value = state.utility()
+    if check_value is not None:  # final state
+        if stats is not None:
+            stats.terminals += 1
+        return (sign * check_value, None)
+    if context is not None and context.tablebase is not None and depth and state.turn_again \
+            and state.free <= context.tablebase.coverage and state.size == context.tablebase.size:
+        if stats is not None:
+            stats.terminals += 1
+        return (sign * context.tablebase.utility(state), None)  # exact, no need to search
+    if context is not None and context.endgame and state.turn_again:
+        solved = loony_endgame(state)
+        if solved is not None:
+            if stats is not None:
+                stats.terminals += 1
+            return (sign * solved[0], solved[1])
+    if depth == limit:  # not final, we hit depth limit, return eval
+        if context is not None:
+            context.horizon_hit = True
+            if stats is not None:
+                stats.leaves += 1
+        evaluate = max_eval if state.max_to_move else min_eval
+        if context is not None and context.eval_cache is not None:
+            return (sign * context.eval_cache.evaluate(state, evaluate), None)
+        return (sign * state.evaluate(evaluate), None)
+
+    geometry = state.geometry
+    moves = geometry.moves
+    first_move = None
+    table = None
+    duplicates = ()
+    if context is not None and context.symmetry and depth == 0 and not state.again:
+        duplicates = state.symmetric_duplicates()
+    if context is not None and context.table is not None:
+        table = context.table
+        if context.symmetry:
+            key, symmetry = state.canonical_key()
+        else:
+            key, symmetry = state.key, 0
+        remaining = limit - depth
+        alpha_start = alpha
+        beta_start = beta
+        entry = table.probe(key)
+        if entry is not None:
+            # only trust entries searched as deep (or 2, 4.. deeper, so the same player's evaluate is at the leaves)
+            # and never at the first move, the caller needs a move to play
+            if depth and entry[2] >= remaining and (entry[2] - remaining) % 2 == 0:
+                if entry[3] == EXACT or (entry[3] == LOWER and entry[1] >= beta) or (entry[3] == UPPER and entry[1] <= alpha):
+                    table.cutoffs += 1
+                    return (entry[1], geometry.inverse_symmetries[symmetry][entry[4]])
+            first_move = geometry.inverse_symmetries[symmetry][entry[4]]  # best move so far goes first
+    if depth == 0 and first_move is None and context is not None and context.root_move is not None:
+        first_move = context.root_move
+
+    ordering = context is not None and context.ordering and not state.again
+    if ordering:
+        moves = order_moves(state, context, depth, first_move)
+    elif first_move is not None:
+        moves = (first_move,) + tuple(move for move in moves if move != first_move)
+
+    return_tuple = ()
+    new_depth = depth + 1
+    handing_back = state.again  # only one child, the turn handed back
+    drawn = state.drawn
+    searched = 0  # children searched so far
+    # principal variation search: after the first child, only ask whether a child beats alpha (a null window),
+    # and search it again with the real window when it does. Not worth it when the children are leaves.
+    pvs = (context is None or context.pvs) and new_depth < limit
+
+    # children are all leaves (and none is final or exact), score them together when there are enough of them
+    leaf_values = None
+    batch = depth == limit - 1 and (context is None or context.batch) and not handing_back \
+            and state.free >= BATCH_MIN_CHILDREN and (context is None or not exact_children(state, context))
+
+    value = neg_infinity
+    timing = stats is not None and depth == 0  # wall time of every first move
+    for number, possible_moves in enumerate(moves):
+        if drawn[possible_moves] or possible_moves in duplicates:
+            continue
+        searched += 1
+        if batch and searched == 2:
+            children = [move for move in moves[number:] if not drawn[move] and move not in duplicates]
+            evaluate = min_eval if state.max_to_move else max_eval
+            if context is not None and context.eval_cache is not None:
+                leaf_values = context.eval_cache.frontier(state, children, evaluate)
+            else:
+                leaf_values = frontier_values(state, children, evaluate)
+            if leaf_values is not None and context is not None:
+                context.horizon_hit = True
+        if timing:
+            start = time.perf_counter()
+        if leaf_values is not None:
+            if context is not None:
+                context.nodes += 1
+                if context.nodes >= context.check_at:
+                    context.check_budget()
+                if stats is not None:
+                    stats.count_node(new_depth)
+                    stats.leaves += 1
+            replace_value = sign * leaf_values[possible_moves]
+        else:
+            state.apply(possible_moves)
+            if searched == 1 or not pvs:
+                replace_value = -negamax(state, max_eval, min_eval, -beta, -alpha, new_depth, limit, context)[0]
+            else:
+                null_window = nextafter(alpha, inf)
+                replace_value = -negamax(state, max_eval, min_eval, -null_window, -alpha, new_depth, limit, context)[0]
+                if alpha < replace_value < beta:
+                    replace_value = -negamax(state, max_eval, min_eval, -beta, -alpha, new_depth, limit, context)[0]
+            state.undo()
+        if timing:
+            stats.root_seconds.append((possible_moves, time.perf_counter() - start))
+        if replace_value > value:
+            value = replace_value
+            return_tuple = (value, possible_moves)
+        if replace_value > alpha:
+            alpha = replace_value
+        if alpha >= beta:
+            if ordering:
+                record_cutoff(state, context, depth, limit - depth, possible_moves)
+            if stats is not None:
+                stats.count_cutoff(searched - 1)
+            break
+        if handing_back:
+            break
+
+    if table is not None:
+        if value <= alpha_start:
+            bound = UPPER
+        elif value >= beta_start:
+            bound = LOWER
+        else:
+            bound = EXACT
+        table.store(key, value, remaining, bound, geometry.symmetries[symmetry][return_tuple[1]])
+
+    return return_tuple
+
+
+# move_ordering_node_counts : nodes searched without and with move ordering, on every position of one game
+# (the game itself is played by the plain search so both counts see the same positions)
+def move_ordering_node_counts(size, max_eval, min_eval, turn_again=True, limit=3):
+    state = SearchState(size, turn_again, max_to_move=turn_again)  # same first player as game_simulation_3/3A
+    positions = []
+    while state.utility() is None:
+        positions.append(state.copy())
+        action = in_place_value(state, max_eval, min_eval, -1, 1, 0, limit)[1]
+        state.apply(action)
+
+    before = SearchContext(symmetry=False, ordering=False)
+    after = SearchContext(symmetry=False, ordering=True)
+    for position in positions:
+        in_place_value(position, max_eval, min_eval, -1, 1, 0, limit, before)
+        in_place_value(position, max_eval, min_eval, -1, 1, 0, limit, after)
+    return before.nodes, after.nodes
+
+
+"""
+Iterative Deepening
+
+Instead of a fixed limit, search to depth 1, then 2, then 3... until the time (seconds) or node budget runs out.
+The move from the last depth that finished is played, so there is always an answer, and each depth searches
+the previous depth's best move first. Depth 1 always finishes. It also stops early once a depth was searched
+without reaching the depth limit anywhere (the whole rest of the game was searched, deeper cannot change it).
+
+Returns (value, move, depth reached), value and move like max_value_2 and friends.
+
+Every depth after the first is searched with an aspiration window, aspiration either side of the value of the
+depth before, which cuts off more. If the value lands outside it, it is only a bound, and that depth is searched
+again with the whole window. The values here are fractions of the boxes and mostly sit near zero, so on the
+benchmark positions every width tried (0.05 to 0.5) searched more nodes than the whole window did, and
+aspiration=None, the default, always searches the whole window.
+"""
+
+
+def iterative_deepening(state, max_eval, min_eval, max_player, turn_again, time_budget=None, node_budget=None,
+                        max_depth=None, context=None, alpha=-1, beta=+1, aspiration=None):
+    search_state = as_search_state(state, max_player, turn_again, copy=True)
+    if context is None:
+        context = SearchContext(TranspositionTable())
+    if max_depth is None:
+        max_depth = inf
+    if context.book is not None:
+        found = context.book.lookup(search_state, max_eval, min_eval)
+        if found is not None:
+            return found[0], found[1], context.book.limit
+
+    result = None
+    depth_reached = 0
+    limit = 1
+    while limit <= max_depth:
+        start = len(search_state.history)
+        context.horizon_hit = False
+        try:
+            if limit == 2:
+                context.start_budget(time_budget, node_budget)  # depth 1 always finishes, even with a budget of 0
+            if result is None or aspiration is None:
+                found = in_place_value(search_state, max_eval, min_eval, alpha, beta, 0, limit, context)
+            else:
+                low = max(alpha, result[0] - aspiration)
+                high = min(beta, result[0] + aspiration)
+                found = in_place_value(search_state, max_eval, min_eval, low, high, 0, limit, context)
+                if (found[0] <= low and low > alpha) or (found[0] >= high and high < beta):
+                    # the value is outside the window, so it is only a bound: search again with the whole window
+                    found = in_place_value(search_state, max_eval, min_eval, alpha, beta, 0, limit, context)
+        except SearchTimeout:
+            while len(search_state.history) > start:
+                search_state.undo()
+            break
+        result = found
+        depth_reached = limit
+        context.root_move = result[1]
+        if not context.horizon_hit:
+            break
+        limit += 1
+
+    context.stop_budget()
+    context.root_move = None
+    return result[0], result[1], depth_reached
+
+
+# search_move : (value, move) for the player to move, by a fixed depth search or, with a budget, iterative deepening
+# an MCTSPlayer in place of an evaluate function picks the moves of its side itself
+def search_move(state, max_eval, min_eval, max_player, turn_again, limit=3, context=None, time_budget=None,
+                node_budget=None):
+    player = max_eval if max_player else min_eval
+    if type(player) is MCTSPlayer:
+        return player.choose(state, max_player, turn_again)
+    if type(max_eval) is MCTSPlayer:
+        max_eval = max_eval.stand_in(True)
+    if type(min_eval) is MCTSPlayer:
+        min_eval = min_eval.stand_in(False)
+    if time_budget is not None or node_budget is not None:
+        return iterative_deepening(state, max_eval, min_eval, max_player, turn_again, time_budget, node_budget,
+                                   context=context)[:2]
+    if max_player:
+        search = max_value_2A if turn_again else max_value_2
+    else:
+        search = min_value_2A if turn_again else min_value_2
+    return search(state, max_eval, min_eval, alpha=-1, beta=+1, depth=0, limit=limit, context=context)
+
+
+"""
+Parallel Root Search
+
+For one move decision on a big board, the time of one search is what matters.
+parallel_root_search searches the first move at the root on its own to get a bound (the Young Brothers Wait idea:
+the eldest brother is searched before the younger ones), then sends every other first move to a process pool
+with that alpha beta window, and combines the answers in move order like the serial loop would.
+Returns the same (value, move) as max_value_2/min_value_2 and the _A versions.
+
+The younger brothers only get the window from the eldest brother, not from each other, so they can search more nodes
+than the serial search and a value outside the window can pick a different move with the same value.
+Pass a pool to reuse one across moves, otherwise one is started for the call.
+concurrent.futures is imported by the functions that start a pool (here and in the simulations, opening book,
+tournaments and game server), so importing this file does not load it.
+"""
+
+def _search_root_child(arguments):
+    bit_state, turn_again, max_to_move, move, max_eval, min_eval, alpha, beta, limit, ordering = arguments
+    state = SearchState.from_bit(bit_state, turn_again, max_to_move)
+    state.apply(move)
+    context = SearchContext(TranspositionTable(1 << 14), symmetry=True, ordering=ordering)
+    return in_place_value(state, max_eval, min_eval, alpha, beta, 1, limit, context)[0], context.nodes
+
+
+def parallel_root_search(state, max_eval, min_eval, max_player, turn_again, limit=3, workers=None, pool=None,
+                         alpha=-1, beta=+1, ordering=True):
+    from concurrent.futures import ProcessPoolExecutor
+    search_state = as_search_state(state, max_player, turn_again, copy=True)
+
+    context = SearchContext(TranspositionTable(1 << 14), symmetry=True, ordering=ordering)
+    if search_state.utility() is not None or search_state.again or limit == 0:
+        return in_place_value(search_state, max_eval, min_eval, alpha, beta, 0, limit, context)
+
+    duplicates = search_state.symmetric_duplicates()
+    if ordering:
+        moves = order_moves(search_state, context, 0)
+    else:
+        moves = search_state.actions()
+    moves = [move for move in moves if move not in duplicates]
+
+    # eldest brother
+    search_state.apply(moves[0])
+    first_value = in_place_value(search_state, max_eval, min_eval, alpha, beta, 1, limit, context)[0]
+    search_state.undo()
+    value = first_value
+    return_tuple = (value, moves[0])
+    if max_player:
+        alpha = max(alpha, first_value)
+    else:
+        beta = min(beta, first_value)
+    if alpha >= beta or len(moves) == 1:
+        return return_tuple
+
+    # younger brothers, all at once with the eldest brother's window
+    bit_state = search_state.to_bit()
+    tasks = [(bit_state, turn_again, max_player, move, max_eval, min_eval, alpha, beta, limit, ordering)
+             for move in moves[1:]]
+    own_pool = pool is None
+    if own_pool:
+        pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        results = list(pool.map(_search_root_child, tasks))
+    finally:
+        if own_pool:
+            pool.shutdown()
+
+    for move, (replace_value, nodes) in zip(moves[1:], results):
+        if max_player:
+            if replace_value > value:
+                value = replace_value
+                return_tuple = (value, move)
+            if replace_value > alpha:
+                alpha = replace_value
+        else:
+            if replace_value < value:
+                value = replace_value
+                return_tuple = (value, move)
+            if replace_value < beta:
+                beta = replace_value
+        if alpha >= beta:
+            break
+    return return_tuple
+
+
+# parallel_root_speedups : seconds for the serial search and for parallel_root_search with each worker count,
+# on the empty board (the widest root) of the given size
+# worker counts above the cores of the machine are left out, there the workers share cores and it only times overhead
+def parallel_root_speedups(size, max_eval, min_eval, turn_again=True, limit=4, worker_counts=(2, 4, 8)):
+    from concurrent.futures import ProcessPoolExecutor
+    state = SearchState(size, turn_again)
+    start = time.perf_counter()
+    serial = in_place_value(state, max_eval, min_eval, -1, 1, 0, limit, SearchContext(TranspositionTable(1 << 14)))
+    times = {1: time.perf_counter() - start}
+    for workers in worker_counts:
+        if workers > (os.cpu_count() or 1):
+            continue
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pool.submit(int).result()  # start the pool before timing
+            start = time.perf_counter()
+            parallel_root_search(state, max_eval, min_eval, True, turn_again, limit, pool=pool)
+            times[workers] = time.perf_counter() - start
+    return serial, {workers: times[1] / times[workers] for workers in times}, times
+
+
+"""
+Monte Carlo Tree Search
+
+Fixed depth alpha beta with the evaluate functions stops scaling past about 5 X 5. MCTSPlayer picks moves by
+playing the rest of the game out many times instead: every iteration walks down the tree by UCT (the child with the
+best average result plus exploration * sqrt(ln visits of the parent / visits of the child)), adds one new child,
+plays a rollout from it to the end of the game and adds the result (1 max wins, -1 min wins, 0 tie) to every
+node on the way back up. The move played is the child visited most.
+
+Rollouts take a capture when there is one (the newest box with one move left first, so chains get taken in
+order), else a random safe move (no box left with three sides drawn for the other player), else any move. A turn handed back under the turn again rule (state.again)
+is a node with one child, move -1, like SearchState.history. Under the turn again rule a node with captures only
+gets the captures and the double deals (double_deals, leaving the last two boxes to the other player) as children:
+a capture costs nothing there, and with every move a child the tree was too wide to find the chains
+(on 5 X 5 it won 2 of 32 games against action_evaluate, with captures and double deals 27 of 32).
+
+The search runs for iterations, or for time_budget seconds if that is given. The tree is kept between moves:
+the next call follows the moves played since (the lines drawn since and turns handed back) down from the last root
+to the node of the new position (the keys are SearchState.key) and starts from there.
+
+An MCTSPlayer goes where max_eval or min_eval go (game_simulation_3A(50, 7, MCTSPlayer(), action_evaluate_min)),
+search_move hands it the moves of its side and returns (value, move) like max_value_2A, value is the average result
+of the move for max. When the other side searches with alpha beta, it uses evaluate (max version, min version)
+for the positions where the MCTSPlayer is to move. Every game starts from Random(seed) and an empty tree, so without
+a time_budget a game always plays the same moves, the same as the evaluate functions.
+"""
+
+MCTS_ITERATIONS = 1000
+EXPLORATION = 0.5
+
+
+class MCTSNode:
+    __slots__ = ("key", "free", "max_to_move", "children", "untried", "visits", "total")
+
+    def __init__(self, state, untried):
+        self.key = state.key
+        self.free = state.free
+        self.max_to_move = state.max_to_move
+        self.children = dict()  # move: MCTSNode
+        self.untried = untried  # moves without a child yet, the next one is popped off the end
+        self.visits = 0
+        self.total = 0  # results added up, for max
+
+
+# playout to the end of the game, the state is given back as it was
+# the free moves are shuffled once, the first safe move in that order is a random safe move
+# boxes with one move left are kept on a stack, so a capture is found without looking at every move
+def rollout(state, rng):
+    start = len(state.history)
+    geometry = state.geometry
+    edge_boxes = geometry.edge_boxes
+    box_edges = geometry.box_edges
+    box_left = state.box_left
+    drawn = state.drawn
+    free = state.actions()
+    rng.shuffle(free)
+    ready = [box for box in range(geometry.boxes) if box_left[box] == 1]
+    while free:
+        if state.again:
+            state.apply(-1)
+            continue
+        move = None
+        while ready and move is None:
+            box = ready.pop()
+            if box_left[box] == 1:
+                for edge in box_edges[box]:
+                    if not drawn[edge]:
+                        move = edge
+        if move is not None:
+            number = free.index(move)
+        else:
+            number = len(free) - 1  # a sacrifice if there is no safe move
+            for index, edge in enumerate(free):
+                for box in edge_boxes[edge]:
+                    if box_left[box] < 3:
+                        break
+                else:
+                    number = index
+                    break
+            move = free[number]
+        free[number] = free[-1]
+        free.pop()
+        state.apply(move)
+        for box in edge_boxes[move]:
+            if box_left[box] == 1:
+                ready.append(box)
+    value = state.utility()
+    while len(state.history) > start:
+        state.undo()
+    return value
+
+
+# moves that give the last two boxes next to a capture to the other player instead of taking them (double dealing):
+# the other line of a box with two lines left that shares a capture with a box ready to be taken
+# (for a loop, where the last four boxes are two such pairs, it is the line between the middle two)
+def double_deals(state, captures):
+    geometry = state.geometry
+    deals = []
+    for capture in captures:
+        for box in geometry.edge_boxes[capture]:
+            if state.box_left[box] == 2:
+                for move in geometry.box_edges[box]:
+                    if move != capture and not state.drawn[move] and move not in deals:
+                        deals.append(move)
+    return deals
+
+
+class MCTSPlayer:
+
+    def __init__(self, iterations=MCTS_ITERATIONS, time_budget=None, exploration=EXPLORATION, seed=0,
+                 evaluate=(action_evaluate_max, action_evaluate_min)):
+        self.iterations = iterations
+        self.time_budget = time_budget
+        self.exploration = exploration
+        self.seed = seed
+        self.evaluate = evaluate  # what an alpha beta search on the other side evaluates this player's positions with
+        self.rng = random.Random(seed)
+        self.root = None
+        self.root_drawn = b""  # lines drawn at the root
+        self.reused = 0  # visits already in the tree when a search started, added up
+
+    # the tree can be big and every game starts without one, so it is not sent to other processes
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["root"] = None
+        return state
+
+    def new_game(self):
+        self.rng = random.Random(self.seed)
+        self.root = None
+        self.root_drawn = b""
+
+    def stand_in(self, max_player):
+        return self.evaluate[0] if max_player else self.evaluate[1]
+
+    def new_node(self, state):
+        if state.again:
+            return MCTSNode(state, [-1])
+        captures, safe, sacrifices = move_groups(state)
+        if captures and state.turn_again:
+            deals = [move for move in double_deals(state, captures) if move not in captures]
+            return MCTSNode(state, deals + captures)
+        return MCTSNode(state, sacrifices + safe + captures)  # captures get a child first
+
+    # the node of the state in the tree of the last search, None if it is not there
+    # only the moves played since then are followed (lines drawn since, and turns handed back)
+    def find_node(self, state):
+        root_drawn = self.root_drawn
+        if self.root is None or len(root_drawn) != len(state.drawn):
+            return None
+        added = set()
+        for move in state.geometry.moves:
+            if state.drawn[move]:
+                if not root_drawn[move]:
+                    added.add(move)
+            elif root_drawn[move]:
+                return None  # not a position of the same game
+        nodes = [self.root]
+        while nodes:
+            node = nodes.pop()
+            if node.key == state.key and node.free == state.free:
+                return node
+            nodes.extend(child for move, child in node.children.items() if move == -1 or move in added)
+        return None
+
+    # one iteration: select, expand, roll out, back up
+    def iterate(self, state, root):
+        path = [root]
+        node = root
+        while not node.untried and node.children:
+            log_visits = math.log(node.visits)
+            sign = 1 if node.max_to_move else -1
+            best_score = -inf
+            best_move = None
+            for move, child in node.children.items():
+                score = sign * child.total / child.visits + self.exploration * math.sqrt(log_visits / child.visits)
+                if score > best_score:
+                    best_score = score
+                    best_move = move
+            state.apply(best_move)
+            node = node.children[best_move]
+            path.append(node)
+        if node.untried:
+            move = node.untried.pop()
+            state.apply(move)
+            child = self.new_node(state)
+            node.children[move] = child
+            path.append(child)
+        value = state.utility()
+        if value is None:
+            value = rollout(state, self.rng)
+        for node in path:
+            node.visits += 1
+            node.total += value
+        for node in path[1:]:
+            state.undo()
+
+    def choose(self, state, max_player, turn_again):
+        search_state = as_search_state(state, max_player, turn_again, copy=True)
+
+        root = self.find_node(search_state)
+        if root is None:
+            root = self.new_node(search_state)
+        else:
+            self.reused += root.visits
+        self.root = root
+        self.root_drawn = bytes(search_state.drawn)
+        deadline = inf if self.time_budget is None else time.perf_counter() + self.time_budget
+        iterations = inf if self.time_budget is not None else self.iterations
+        done = 0
+        while done < iterations:
+            self.iterate(search_state, root)
+            done += 1
+            if done % 16 == 0 and time.perf_counter() >= deadline:
+                break
+
+        if search_state.again:  # the turn is only handed back, any move stands for it
+            return (root.total / root.visits, search_state.actions()[0])
+        best = None
+        for move, child in root.children.items():
+            if best is None or child.visits > best[1].visits:
+                best = (move, child)
+        return (best[1].total / best[1].visits, best[0])
+
+
+"""
+For Testing Purposes 
+THIS IS A RANDOM PLAYER, HE WILL BE CONSIDERED A MIN PLAYER 
+"""
+
+def Randy_Random(state):
+    
+    randy_moves = actions_in(state)
+    randy_state = state.copy()
+    ranGe = len(randy_moves)
+    randy_choice = randint(0, ranGe-1) #top end it can be equal to, we need to subtract by 1 for the correct range of possible indices
+    
+    #This is the index of the random action Randy will manipulate in the state
+    his_move = randy_moves[randy_choice]
+    
+    #This is the new state after randy has acted upon it
+    final_state = min_successor(randy_state, his_move)
+    
+    return final_state
+
+"""
+Print Representation
+"""
+
+def draw_DBQ(list_rep):
+    if type(list_rep) is not list:
+        list_rep = to_list_rep(list_rep)
+    if list_rep[-1] == 'A':
+        list_rep = list_rep[:-1]  # the turn again marker is not part of the board
+    line_number = 0
+    for get_line in range(0, len(list_rep), int(math.sqrt(len(list_rep)))):
+
+        #Either printing - or | two cases to sift through
+
+        if line_number % 2 != 0:#odd line number, |, " ", or box winning identifiers
+            print("\n")
+            for index_v in range(0, int(math.sqrt(len(list_rep)))): # size_l *2 + 1, math to cycle through said line
+            
+                if list_rep[index_v + get_line] == '+': 
+                    print("|", end = " ")
+                elif list_rep[index_v + get_line] == 'X': 
+                    print("X", end = " ")
+                elif list_rep[index_v + get_line] == 'x': 
+                    print("x", end = " ")
+                elif list_rep[index_v + get_line] == 'o': 
+                    print("o", end = " ")
+                elif list_rep[index_v + get_line] == 'O':
+                    print("O", end = " ")
+                elif list_rep[index_v + get_line] == '?':
+                    print("?", end = " ")
+                else:
+                    print(" ", end = " ")
+        else: #its even *, -, or box winning identifiers
+            print("\n")
+            for index in range(0, int(math.sqrt(len(list_rep)))): 
+                if list_rep[index + get_line] == '*':
+                    print("*", end  = " ")
+                elif list_rep[index + get_line] == '?':
+                    print("?", end = " ")
+                elif list_rep[index + get_line] == '+':
+                    print("-", end = " ")
+                elif list_rep[index + get_line] == 'X': 
+                    print("X", end = " ")
+                elif list_rep[index + get_line] == 'O': 
+                    print("O", end = " ")
+                elif list_rep[index + get_line] == 'x': 
+                    print("x", end = " ")
+                elif list_rep[index + get_line] == 'o': 
+                    print("o", end = " ")
+                else:
+                    print(" ", end = " ")
+
+        line_number += 1
+
+
+
+"""
+Game Log
+
+game_simulation_3/3A only keep [ties, max wins, min wins]. With log=file name every game is also appended to a log
+file as soon as it is over: game number, size, rules, evaluate functions, utility and every move
+(who moved, the move, boxes it finished, seconds the search took). A turn only handed back under the turn again rule
+is move -1, like SearchState.history. Games are not kept in memory (play_games only keeps the moves of the one game
+a matchup without random openings repeats), so a run can log any number of games.
+
+A file name ending in .jsonl (or .json) gets one JSON object per line, anything else the binary format:
+    header  - b"DBGL", format version (GAME_LOG_HEADER), once at the start of the file
+    games   - game number, size, turn again, utility, lengths of the two evaluate names, number of moves
+              (GAME_RECORD), the two names, then one GAME_MOVE per move: move, flags (1 max moved,
+              2 x boxes finished), seconds
+read_game_log gives the games back one at a time in the same dict form, whatever the format,
+so millions of games can be gone through (summarize_game_log, replay_game) without loading the file.
+With workers every chunk logs to a file of its own and simulate_matchups adds them to the log in game order.
+"""
+
+GAME_LOG_HEADER = struct.Struct("<4sH")
+GAME_LOG_MAGIC = b"DBGL"
+GAME_LOG_VERSION = 1
+GAME_RECORD = struct.Struct("<IHBbBBH")
+GAME_MOVE = struct.Struct("<hBf")
+
+
+# name of an evaluate function (or "mcts") for the log and the results
+def player_name(player):
+    if type(player) is MCTSPlayer:
+        return "mcts"
+    return player.__name__
+
+
+# boxes the move finishes (0, 1 or 2), for any representation
+def move_captures(env, action):
+    if type(env) is SearchState:
+        return sum(1 for box in env.geometry.edge_boxes[action] if env.box_left[box] == 1)
+    if type(env) is BitState:
+        geometry = board_geometry(env.size)
+        free = geometry.all_moves & ~env.drawn
+        return sum(1 for box in geometry.edge_boxes[action] if (geometry.box_masks[box] & free).bit_count() == 1)
+    return boxes_won(env, action)
+
+
+# the player to move only hands the turn back (the other player finished a box under the turn again rule)
+def handed_back(env):
+    if type(env) is list:
+        return env[-1] == 'A'
+    return env.again
+
+
+def game_record(game, size_of_game, turn_again, max_eval, min_eval, u, moves):
+    return dict(game=game, size=size_of_game, turn_again=turn_again, max_eval=player_name(max_eval),
+                min_eval=player_name(min_eval), utility=u, moves=moves)
+
+
+def log_format(file_name):
+    return "jsonl" if file_name.endswith(".jsonl") or file_name.endswith(".json") else "binary"
+
+
+class GameLog:
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.format = log_format(file_name)
+        if self.format == "jsonl":
+            self.stream = open(file_name, "a")
+        else:
+            self.stream = open(file_name, "ab")
+            if self.stream.tell() == 0:
+                self.stream.write(GAME_LOG_HEADER.pack(GAME_LOG_MAGIC, GAME_LOG_VERSION))
+
+    # record : a game_record, moves as (max moved, move, boxes finished, seconds)
+    def write(self, record):
+        if self.format == "jsonl":
+            self.stream.write(json.dumps(record) + "\n")
+        else:
+            max_name = record["max_eval"].encode()
+            min_name = record["min_eval"].encode()
+            parts = [GAME_RECORD.pack(record["game"], record["size"], record["turn_again"], record["utility"],
+                                      len(max_name), len(min_name), len(record["moves"])), max_name, min_name]
+            for max_moved, move, captured, seconds in record["moves"]:
+                parts.append(GAME_MOVE.pack(move, max_moved | captured << 1, seconds))
+            self.stream.write(b"".join(parts))
+        self.stream.flush()  # a game is in the file as soon as it is over
+
+    def close(self):
+        self.stream.close()
+
+
+# the games of a log file one at a time, as game_record dicts
+def read_game_log(file_name):
+    with open(file_name, "rb") as stream:
+        start = stream.read(GAME_LOG_HEADER.size)
+        if len(start) < GAME_LOG_HEADER.size or GAME_LOG_HEADER.unpack(start)[0] != GAME_LOG_MAGIC:
+            stream.seek(0)
+            for line in stream:
+                if line.strip():
+                    yield json.loads(line)
+            return
+        if GAME_LOG_HEADER.unpack(start)[1] != GAME_LOG_VERSION:
+            raise ValueError(file_name + " is a game log of another version")
+        while True:
+            header = stream.read(GAME_RECORD.size)
+            if not header:
+                return
+            if len(header) < GAME_RECORD.size:
+                raise ValueError(file_name + " is cut short")
+            game, size_of_game, turn_again, u, max_length, min_length, move_count = GAME_RECORD.unpack(header)
+            max_name = stream.read(max_length).decode()
+            min_name = stream.read(min_length).decode()
+            data = stream.read(move_count * GAME_MOVE.size)
+            if len(data) < move_count * GAME_MOVE.size:
+                raise ValueError(file_name + " is cut short")
+            moves = [[bool(flags & 1), move, flags >> 1, seconds]
+                     for move, flags, seconds in GAME_MOVE.iter_unpack(data)]
+            yield dict(game=game, size=size_of_game, turn_again=bool(turn_again), max_eval=max_name,
+                       min_eval=min_name, utility=u, moves=moves)
+
+
+# add the games of the log part_name to the end of the log file_name (same format) and remove part_name
+def append_game_log(file_name, part_name):
+    if not os.path.exists(part_name):
+        return
+    with open(part_name, "rb") as part:
+        if log_format(file_name) == "binary":
+            part.seek(GAME_LOG_HEADER.size)
+        with open(file_name, "ab") as stream:
+            if log_format(file_name) == "binary" and stream.tell() == 0:
+                stream.write(GAME_LOG_HEADER.pack(GAME_LOG_MAGIC, GAME_LOG_VERSION))
+            shutil.copyfileobj(part, stream)
+    os.remove(part_name)
+
+
+# the list representation after every move of a logged game
+def replay_game(record):
+    env = make_list_rep(record["size"])
+    for max_moved, move, captured, seconds in record["moves"]:
+        if move < 0:
+            move = actions_in(env)[0]  # any move hands the turn back
+        if max_moved:
+            env = max_successor_A(env, move) if record["turn_again"] else max_successor(env, move)
+        else:
+            env = min_successor_A(env, move) if record["turn_again"] else min_successor(env, move)
+        yield env
+
+
+# totals over a whole log, reading one game at a time
+# a capture run is the boxes one player finishes in a row (a chain taken under the turn again rule)
+def summarize_game_log(file_name):
+    games = 0
+    record = [0, 0, 0]
+    moves = 0
+    seconds = 0
+    runs = dict()  # length of a capture run: how many
+    for game in read_game_log(file_name):
+        games += 1
+        record[game["utility"]] += 1
+        run = 0
+        runner = None
+        for max_moved, move, captured, move_seconds in game["moves"]:
+            if move < 0:
+                continue
+            moves += 1
+            seconds += move_seconds
+            if captured and max_moved == runner:
+                run += captured
+            else:
+                if run:
+                    runs[run] = runs.get(run, 0) + 1
+                run = captured
+                runner = max_moved
+        if run:
+            runs[run] = runs.get(run, 0) + 1
+    return dict(games=games, ties=record[0], max_wins=record[1], min_wins=record[-1], moves=moves,
+                moves_per_game=moves / games if games else None, seconds_per_move=seconds / moves if moves else None,
+                capture_runs={length: runs[length] for length in sorted(runs)},
+                longest_capture_run=max(runs, default=0))
+
+
+"""
+
+Game Simulations
+Game Simulation 2 will run an evaluate pairing for a number of different sized games, 
+starting at 2 X 2 up to whatever max size is declared. 
+This simulation is not used for testing but is available to determine if the size of the game impacts the matchup. 
+To reduce runtime of implementing this I opted for comparing matchups against game mechanics.  
+ 
+Game Simulation 3 and 3A run any number of games at any given size. 
+Both min and max evaluate algorthims are passed. 
+ 
+Game simulation 3 does not have the turn again mechanic.
+ 
+Game simulation 3A does have the turn again mechanic. 
+
+engine picks the game state representation: "list" (make_list_rep), "bit" (BitState, much faster on 5 X 5 and up)
+or "in_place" (SearchState, searched with apply/undo and no copies). All of them play the exact same moves.
+context is an optional SearchContext for every search in the run (for example with a TranspositionTable),
+it is reset with new_game() before each game and its counters add up over the whole run.
+limit is the search depth of every move. With time_budget (seconds) or node_budget each move is instead
+searched by iterative_deepening as deep as the budget allows.
+workers runs the games on that many processes (see simulate_matchups), the records are the same as with one.
+
+max_eval and min_eval can also be an MCTSPlayer (see Monte Carlo Tree Search), which then picks that side's moves.
+
+Without a time_budget nothing in a game is random, so all games of a matchup play the same moves.
+play_games then plays each distinct game once and counts it for every game that would have repeated it
+(context counters only count the searches that really ran, the same for context.stats and context.game_stats).
+random_openings makes the games different: the first random_openings turns of every game are random moves,
+drawn from a random.Random seeded with seed and the game number, so a run gives the same record every time
+and on any number of workers. Games that happen to get the same opening are still only played once.
+log adds every game, moves and all, to a game log file (see Game Log).
+"""
+
+# turn_again also decides who moves first, for the representations that keep the player to move
+def make_start_state(size_of_game, engine="list", turn_again=False):
+    if engine == "bit":
+        return make_bit_rep(size_of_game)
+    elif engine == "in_place":
+        return SearchState(size_of_game, turn_again, max_to_move=turn_again)
+    elif engine == "list":
+        return make_list_rep(size_of_game)
+    raise ValueError("unknown engine: " + str(engine))
+
+
+# play_game : plays one game and returns its utility (1 max wins, -1 min wins, 0 tie)
+# game_simulation_3 lets min make the first move, game_simulation_3A lets max make the first move
+# opening is a list of moves played before the searches take over (see random_opening)
+# moves, a list, gets (max moved, move, boxes finished, seconds) for every move (see Game Log)
+def play_game(size_of_game, max_eval, min_eval, turn_again, engine="list", context=None, limit=3, time_budget=None,
+              node_budget=None, opening=(), moves=None):
+    env = make_start_state(size_of_game, engine, turn_again)
+    if context is not None:
+        context.new_game()
+    for player in (max_eval, min_eval):
+        if type(player) is MCTSPlayer:
+            player.new_game()
+    max_turn = turn_again
+    turn = 0
+    while utility(env) is None:
+        seconds = 0
+        if turn < len(opening):
+            action = opening[turn]
+        else:
+            start = time.perf_counter()
+            value, action = search_move(env, max_eval, min_eval, max_turn, turn_again, limit, context, time_budget,
+                                        node_budget)
+            seconds = time.perf_counter() - start
+            if context is not None and context.stats is not None:
+                context.stats.move_seconds.append(seconds)
+        if moves is not None:
+            if handed_back(env):
+                moves.append((max_turn, -1, 0, seconds))
+            else:
+                moves.append((max_turn, action, move_captures(env, action), seconds))
+        turn += 1
+        if max_turn:
+            env = max_successor_A(env, action) if turn_again else max_successor(env, action)
+        else:
+            env = min_successor_A(env, action) if turn_again else min_successor(env, action)
+        max_turn = not max_turn
+    return utility(env)
+
+
+# the players of a game always pick the same moves, so a game only needs playing once per opening
+def repeatable(max_eval, min_eval, time_budget=None):
+    if time_budget is not None:
+        return False
+    return all(type(player) is not MCTSPlayer or player.time_budget is None for player in (max_eval, min_eval))
+
+
+# random_opening : moves of the first turns of a game, picked at random
+# a turn that only hands the turn back still uses up one of the turns (any free move stands for it)
+def random_opening(size_of_game, turn_again, turns, rng):
+    env = make_list_rep(size_of_game)
+    max_turn = turn_again
+    opening = []
+    while len(opening) < turns and utility(env) is None:
+        action = rng.choice(actions_in(env))
+        if max_turn:
+            env = max_successor_A(env, action) if turn_again else max_successor(env, action)
+        else:
+            env = min_successor_A(env, action) if turn_again else min_successor(env, action)
+        max_turn = not max_turn
+        opening.append(action)
+    return opening
+
+
+# repeatable random.Random for one game of a run, the same in every process
+def game_random(seed, game):
+    return random.Random(str(seed) + ":" + str(game))
+
+
+# play_games : record [ties, max wins, min wins] of a number of games, this is the piece of work a worker process runs
+# the context comes back too so its counters can be added to the caller's context
+# first_game is the number of the first game, so the games of a chunk get the same openings as in one long run
+# log is a game log file name, every game is added to it when it is over (see Game Log)
+def play_games(games_played, size_of_game, max_eval, min_eval, turn_again, engine="list", context=None, limit=3,
+               time_budget=None, node_budget=None, seed=0, random_openings=0, first_game=0, log=None):
+    record = [0, 0, 0]
+    # opening: (utility, moves), the rest of the game is always played the same way
+    # moves are only kept when every game is the same, with random openings a game that comes up again is played again
+    results = dict()
+    game_log = None if log is None else GameLog(log)
+    moves = None
+    try:
+        for game in range(first_game, first_game + games_played):
+            opening = ()
+            if random_openings:
+                opening = tuple(random_opening(size_of_game, turn_again, random_openings, game_random(seed, game)))
+            if game_log is not None:
+                moves = []
+            if opening in results and repeatable(max_eval, min_eval, time_budget) \
+                    and (game_log is None or results[opening][1] is not None):
+                u, moves = results[opening]
+            elif context is not None and context.stats is not None:
+                matchup_stats = context.stats
+                context.stats = SearchStats()  # this game only
+                u = play_game(size_of_game, max_eval, min_eval, turn_again, engine, context, limit, time_budget,
+                              node_budget, opening, moves)
+                context.stats.games = 1
+                context.game_stats.append(context.stats)
+                matchup_stats.add(context.stats)
+                context.stats = matchup_stats
+                results[opening] = (u, None if random_openings else moves)
+            else:
+                u = play_game(size_of_game, max_eval, min_eval, turn_again, engine, context, limit, time_budget,
+                              node_budget, opening, moves)
+                results[opening] = (u, None if random_openings else moves)
+            record[u] += 1  # -1, min win, 0 = tie, 1 = max win
+            if game_log is not None:
+                game_log.write(game_record(game, size_of_game, turn_again, max_eval, min_eval, u, moves))
+    finally:
+        if game_log is not None:
+            game_log.close()
+    return record, context
+
+
+def _play_games_chunk(arguments):
+    if arguments.get("context") is not None:
+        arguments["context"].clear_counts()  # only send back what this chunk counted
+    return play_games(**arguments)
+
+
+"""
+Running games on several processes
+
+simulate_matchups plays a list of matchups, each one a dict of play_games arguments
+(games_played, size_of_game, max_eval, min_eval, turn_again, and optionally engine, context, limit, ...),
+and returns their records in the same order.
+With workers > 1 every matchup is cut into chunks of chunk_size games and all chunks of all matchups go to one
+ProcessPoolExecutor (a matchup where every game is the same, see repeatable, with no random_openings is one chunk,
+its one game only needs playing once). Every game starts fresh (context.new_game), so a game plays the same no matter which process
+or chunk it lands in and the records do not depend on the number of workers (unless a time_budget is used,
+then the depth reached depends on the machine). Context counters from the workers are added to each matchup's context.
+"""
+
+
+def simulate_matchups(matchups, workers=None, chunk_size=None):
+    from concurrent.futures import ProcessPoolExecutor
+    if workers is None or workers <= 1:
+        return [play_games(**matchup)[0] for matchup in matchups]
+
+    if chunk_size is None:
+        # about 4 chunks per worker, so one slow chunk does not leave the other workers waiting
+        total_games = sum(matchup["games_played"] for matchup in matchups)
+        chunk_size = max(1, math.ceil(total_games / (workers * 4)))
+
+    chunks = []
+    owners = []  # matchup number of each chunk
+    parts = []  # game log each chunk writes to, added to its matchup's log when the chunk is done
+    for number, matchup in enumerate(matchups):
+        step = chunk_size
+        if not matchup.get("random_openings") and repeatable(matchup["max_eval"], matchup["min_eval"],
+                                                             matchup.get("time_budget")):
+            step = max(1, matchup["games_played"])
+        for first_game in range(0, matchup["games_played"], step):
+            chunk = dict(matchup)
+            chunk["games_played"] = min(step, matchup["games_played"] - first_game)
+            chunk["first_game"] = matchup.get("first_game", 0) + first_game
+            if matchup.get("log") is not None:
+                # same ending as the log, so the part is written in the log's format
+                root, extension = os.path.splitext(matchup["log"])
+                chunk["log"] = "%s.%d.%d.part%s" % (root, os.getpid(), len(chunks), extension)
+                if os.path.exists(chunk["log"]):
+                    os.remove(chunk["log"])
+            chunks.append(chunk)
+            owners.append(number)
+            parts.append(chunk.get("log"))
+
+    records = [[0, 0, 0] for matchup in matchups]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for number, part, (record, context) in zip(owners, parts, pool.map(_play_games_chunk, chunks)):
+            for slot in range(3):
+                records[number][slot] += record[slot]
+            if context is not None:
+                matchups[number]["context"].add_counts(context)
+            if part is not None:
+                append_game_log(matchups[number]["log"], part)
+    return records
+
+
+def game_simulation_2(games_played,max_size_of_game, max_eval,min_eval, engine="list", context=None, limit=3,
+                      time_budget=None, node_budget=None, workers=None, seed=0, random_openings=0, log=None):
+    sizes = list(range(2, max_size_of_game))
+    matchups = []
+    for size_of_game in sizes:
+        matchups.append(dict(games_played=games_played, size_of_game=size_of_game, max_eval=max_eval,
+                             min_eval=min_eval, turn_again=False, engine=engine, context=context, limit=limit,
+                             time_budget=time_budget, node_budget=node_budget, seed=seed,
+                             random_openings=random_openings, log=log))
+    records = simulate_matchups(matchups, workers)
+    record_maps = dict()
+    for size_of_game, record in zip(sizes, records):
+        record_maps[size_of_game] = record
+    return record_maps #returns the record
+
+#Different simulatoed games that are then later graphed
+def game_simulation_3(games_played,size_of_game,max_eval,min_eval, engine="list", context=None, limit=3,
+                      time_budget=None, node_budget=None, workers=None, seed=0, random_openings=0, log=None):
+    matchup = dict(games_played=games_played, size_of_game=size_of_game, max_eval=max_eval, min_eval=min_eval,
+                   turn_again=False, engine=engine, context=context, limit=limit, time_budget=time_budget,
+                   node_budget=node_budget, seed=seed, random_openings=random_openings, log=log)
+    return simulate_matchups([matchup], workers)[0] #returns the record
+
+#Different simulatoed games that are then later graphed
+def game_simulation_3A(games_played,size_of_game,max_eval,min_eval, engine="list", context=None, limit=3,
+                       time_budget=None, node_budget=None, workers=None, seed=0, random_openings=0, log=None):
+    matchup = dict(games_played=games_played, size_of_game=size_of_game, max_eval=max_eval, min_eval=min_eval,
+                   turn_again=True, engine=engine, context=context, limit=limit, time_budget=time_budget,
+                   node_budget=node_budget, seed=seed, random_openings=random_openings, log=log)
+    return simulate_matchups([matchup], workers)[0] #returns the record
+
+
+"""
+Lockstep Games
+
+lockstep_simulation plays games_played games at once for cheap players that only look one move ahead.
+All boards are rows of NumPy arrays (lines drawn and moves left on every box), and every step makes one move on every
+board, so a whole batch costs about as many NumPy calls as one game has moves.
+Every game lasts exactly one move per line, so all the boards finish on the same step.
+
+The player for each side is one of LOCKSTEP_POLICIES:
+    "random"   - any free move, like Randy_Random
+    "greedy"   - finishes a box when it can, otherwise random
+    "evaluate" - the move the alpha beta search plays with limit=1, using max_eval and min_eval the same way
+                 (a max move is valued by min_eval on the board after it, a min move by max_eval)
+Classic rules let min move first, turn again lets max move first and a player that finishes a box moves again,
+the same games as game_simulation_3 and game_simulation_3A. Two "evaluate" players with limit=1 give exactly
+the record of game_simulation_3/3A(..., limit=1), for a fraction of the time.
+seed makes the random players repeatable. Returns the record [ties, max wins, min wins].
+"""
+
+LOCKSTEP_POLICIES = ("random", "greedy", "evaluate")
+
+
+def lockstep_simulation(games_played, size_of_game, max_eval, min_eval, turn_again, max_policy="evaluate",
+                        min_policy="evaluate", seed=None):
+    for policy in (max_policy, min_policy):
+        if policy not in LOCKSTEP_POLICIES:
+            raise ValueError("unknown policy: " + str(policy))
+    np = numpy_module()
+    if np is None:
+        raise ImportError("lockstep_simulation needs NumPy")
+
+    geometry = board_geometry(size_of_game)
+    sides = side_matrix(size_of_game)
+    moves = np.array(geometry.moves)
+    move_sides = sides[moves]  # moves x boxes
+    games = np.arange(games_played)
+    rng = np.random.default_rng(seed)
+
+    drawn = np.zeros((games_played, len(moves)), dtype=bool)
+    box_left = np.full((games_played, geometry.boxes), 4, dtype=np.intp)
+    max_score = np.zeros(games_played, dtype=np.intp)
+    min_score = np.zeros(games_played, dtype=np.intp)
+    max_turn = np.full(games_played, turn_again)
+
+    for step in range(len(moves)):
+        choice = np.zeros(games_played, dtype=np.intp)  # column of moves
+        for max_player, policy in ((True, max_policy), (False, min_policy)):
+            rows = games[max_turn == max_player]
+            if len(rows):
+                choice[rows] = lockstep_choice(np, rng, policy, box_left[rows], drawn[rows], move_sides, max_player,
+                                               min_eval if max_player else max_eval, size_of_game)
+
+        drawn[games, choice] = True
+        box_left -= move_sides[choice]
+        won = ((box_left == 0) & (move_sides[choice] == 1)).sum(axis=1)
+        max_score += np.where(max_turn, won, 0)
+        min_score += np.where(max_turn, 0, won)
+        if turn_again:
+            max_turn ^= won == 0
+        else:
+            max_turn = ~max_turn
+
+    record = [0, 0, 0]
+    for u in np.sign(max_score - min_score).tolist():
+        record[u] += 1  # -1, min win, 0 = tie, 1 = max win
+    return record
+
+
+# lockstep_choice : column of moves each board plays, for boards where the same side is to move
+def lockstep_choice(np, rng, policy, box_left, drawn, move_sides, max_player, evaluate, size_of_game):
+    if policy == "evaluate":
+        weights = evaluate_weights(evaluate, size_of_game)
+        if weights is None:
+            raise ValueError("lockstep_simulation can not batch evaluate function " + evaluate.__name__)
+        weights = np.array(weights, dtype=np.float64)
+        values = np.zeros(drawn.shape)
+        for box in range(box_left.shape[1]):  # one box after another, the same order as weighted_evaluate
+            values += weights[box_left[:, box:box + 1] - move_sides[:, box]]
+        if drawn.shape[1] - drawn[0].sum() == 1:
+            return np.argmin(drawn, axis=1)  # the last move ends the game, there is nothing to compare
+        # the root window is -1..1, the search stops at the first move that reaches it
+        if max_player:
+            return np.argmax(np.where(drawn, -inf, np.minimum(values, 1)), axis=1)
+        return np.argmin(np.where(drawn, inf, np.maximum(values, -1)), axis=1)
+
+    scores = rng.random(drawn.shape)
+    if policy == "greedy":
+        captures = (box_left == 1).astype(np.intp) @ move_sides.T > 0
+        scores += captures
+    return np.argmax(np.where(drawn, -1, scores), axis=1)
+
+
+"""
+Tournaments
+
+run_tournament plays a whole tournament from a spec (a dict, or a JSON file for the command line):
+    evaluators  - names from EVALUATE_FUNCTIONS (or "mcts"), every pair of them plays
+    sizes       - board sizes
+    rules       - "classic" and/or "turn_again"
+    colors      - true: each pair plays both ways round (each evaluator as max once), false: the first as max only
+    games       - games of each matchup
+plus the play_games settings (limit, engine, time_budget, node_budget, seed, random_openings, mcts_iterations,
+mcts_seconds), defaults in TOURNAMENT_SPEC. tournament_units expands it into work units of at most unit_games games
+(a matchup where every game is the same is one unit), which go to a ProcessPoolExecutor. Each unit is added to the
+checkpoint file (JSON lines, the spec first) as soon as it is done, so a run that was stopped
+picks up where it stopped: run_tournament again with the same checkpoint only plays the units not in it.
+The games of a unit are numbered like one long run (first_game), so the records do not depend on the units or workers.
+
+tournament_rows adds the units up into one row per pairing, size and rule in result_row form (colors together:
+ties, wins of the first evaluator, wins of the second), ready for write_rows and graph_rows/make_graph.
+"""
+
+TOURNAMENT_SPEC = dict(evaluators=["snatch", "action", "set_up"], sizes=[3], rules=["classic", "turn_again"],
+                       colors=True, games=50, unit_games=10, limit=3, engine="bit", time_budget=None,
+                       node_budget=None, seed=0, random_openings=0, mcts_iterations=MCTS_ITERATIONS, mcts_seconds=None)
+
+
+def tournament_spec(spec):
+    full = dict(TOURNAMENT_SPEC)
+    full.update(spec)
+    unknown = set(full) - set(TOURNAMENT_SPEC)
+    if unknown:
+        raise ValueError("unknown tournament settings: " + ", ".join(sorted(unknown)))
+    for name in full["evaluators"]:
+        if name not in EVALUATE_FUNCTIONS and name != "mcts":
+            raise ValueError("unknown evaluator: " + name)
+    for rule in full["rules"]:
+        if rule not in ("classic", "turn_again"):
+            raise ValueError("unknown rule: " + rule)
+    return json.loads(json.dumps(full))  # the way it reads back from the checkpoint (lists, not tuples)
+
+
+# (pairing, max name, min name): every pair of evaluators, both ways round with colors
+def tournament_pairings(spec):
+    pairings = []
+    for first, second in itertools.combinations(spec["evaluators"], 2):
+        pairings.append(((first, second), first, second))
+        if spec["colors"]:
+            pairings.append(((first, second), second, first))
+    return pairings
+
+
+# every work unit of a tournament, as a dict: unit (its name), pairing, max_eval, min_eval, size, rule, first_game, games
+def tournament_units(spec):
+    units = []
+    for rule in spec["rules"]:
+        for size_of_game in spec["sizes"]:
+            for pairing, max_name, min_name in tournament_pairings(spec):
+                step = spec["unit_games"]
+                if not spec["random_openings"] and spec["time_budget"] is None \
+                        and (spec["mcts_seconds"] is None or "mcts" not in (max_name, min_name)):
+                    step = max(1, spec["games"])  # every game is the same, play_games plays it once
+                for first_game in range(0, spec["games"], step):
+                    games_played = min(step, spec["games"] - first_game)
+                    units.append(dict(unit="%s:%s:%d:%s:%d" % (max_name, min_name, size_of_game, rule, first_game),
+                                      pairing=list(pairing), max_eval=max_name, min_eval=min_name,
+                                      size=size_of_game, rule=rule, first_game=first_game, games=games_played))
+    return units
+
+
+def tournament_player(spec, name, max_player):
+    if name == "mcts":
+        return MCTSPlayer(spec["mcts_iterations"], spec["mcts_seconds"], seed=spec["seed"])
+    return EVALUATE_FUNCTIONS[name][0 if max_player else 1]
+
+
+def _play_tournament_unit(arguments):
+    spec, unit = arguments
+    record = play_games(unit["games"], unit["size"], tournament_player(spec, unit["max_eval"], True),
+                        tournament_player(spec, unit["min_eval"], False), unit["rule"] == "turn_again",
+                        spec["engine"], None, spec["limit"], spec["time_budget"], spec["node_budget"], spec["seed"],
+                        spec["random_openings"], unit["first_game"])[0]
+    return dict(unit, record=record)
+
+
+# the units a checkpoint file has finished, {unit name: unit with its record}
+# a line cut short by a run that was killed is left out (that unit is played again)
+def read_checkpoint(file_name, spec):
+    done = dict()
+    if not os.path.exists(file_name):
+        return done
+    with open(file_name) as stream:
+        for number, line in enumerate(stream):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if number == 0:
+                if entry.get("spec") != spec:
+                    raise ValueError(file_name + " is the checkpoint of another tournament")
+                continue
+            done[entry["unit"]] = entry
+    return done
+
+
+# output (a stream) gets a line for every unit as it finishes
+def run_tournament(spec, checkpoint, workers=None, output=None):
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    spec = tournament_spec(spec)
+    done = read_checkpoint(checkpoint, spec)
+    units = [unit for unit in tournament_units(spec) if unit["unit"] not in done]
+    with open(checkpoint, "a+") as stream:
+        if stream.tell() == 0:
+            stream.write(json.dumps(dict(spec=spec)) + "\n")
+        else:
+            stream.seek(stream.tell() - 1)
+            if stream.read(1) != "\n":
+                stream.write("\n")  # end the line a killed run cut short
+        stream.flush()
+        if workers is None or workers <= 1:
+            results = (_play_tournament_unit((spec, unit)) for unit in units)
+            pool = None
+        else:
+            pool = ProcessPoolExecutor(max_workers=workers)
+            results = (future.result() for future in
+                       as_completed([pool.submit(_play_tournament_unit, (spec, unit)) for unit in units]))
+        try:
+            for number, entry in enumerate(results):
+                done[entry["unit"]] = entry
+                stream.write(json.dumps(entry) + "\n")
+                stream.flush()
+                if output is not None:
+                    output.write("%s %s (%d of %d units left)\n" % (entry["unit"], entry["record"],
+                                                                     len(units) - number - 1, len(units)))
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+    return tournament_rows(spec, done)
+
+
+# one result_row per pairing, size and rule, with the wins of the two evaluators of the pairing (both colors)
+def tournament_rows(spec, done):
+    rows = []
+    for rule in spec["rules"]:
+        for size_of_game in spec["sizes"]:
+            for pairing in itertools.combinations(spec["evaluators"], 2):
+                first, second = pairing
+                record = [0, 0, 0]  # ties, first wins, second wins
+                games_played = 0
+                for entry in done.values():
+                    if entry["pairing"] == list(pairing) and entry["size"] == size_of_game and entry["rule"] == rule:
+                        games_played += entry["games"]
+                        ties, max_wins, min_wins = entry["record"]
+                        record[0] += ties
+                        if entry["max_eval"] == first:
+                            record[1] += max_wins
+                            record[2] += min_wins
+                        else:
+                            record[1] += min_wins
+                            record[2] += max_wins
+                title = "%s %d X %d: %s vs. %s" % ("Turn Again" if rule == "turn_again" else "No Turn Again",
+                                                   size_of_game, size_of_game, first, second)
+                row = result_row(title, first, second, rule == "turn_again", size_of_game, games_played, record)
+                row["colors"] = "both" if spec["colors"] else "first as max"
+                rows.append(row)
+    return rows
+
+
+"""
+Game Server
+
+GameServer hosts games against the minimax bots over TCP, one JSON object per line each way (asyncio, no WebSocket).
+A connection can play any number of sessions, and they end when it closes.
+    {"cmd": "new", "size": 3, "turn_again": true, "bot": "action", "human": "min", "limit": 3,
+     "clock": 60, "increment": 0}                                     starts a session (all but cmd are optional)
+    {"cmd": "move", "session": 1, "move": 13}                         the human's move
+    {"cmd": "state", "session": 1}                                    where the game is
+    {"cmd": "resign", "session": 1}
+    {"cmd": "stats"}                                                  server move latency (p50, p99)
+Every answer is the session's state: lines drawn, score, legal moves, whose move it is, the bot's moves since the
+last answer, both clocks and the result once the game is over ("max", "min" or "tie"), or {"error": ...}.
+Games are BitStates played like play_game (max moves first with the turn again rule, min without it), and a turn
+that is only handed back under the turn again rule is played by the server.
+
+The bot searches with search_move (its evaluate function for both sides) in a ProcessPoolExecutor, so the event loop
+never waits on a search and many sessions search at once. With a clock (seconds for each side) the bot searches by
+iterative deepening with its time left over the moves it still has to make, and is only charged for the search
+itself (not the wait for a worker). The human's clock runs from the answer that gave them the move until their
+move arrives, plus increment after every move; a side whose clock runs out loses.
+
+load_test plays players concurrent random players against a server on localhost and reports the latency of every
+move request (send to answer, bot moves included) as p50/p99, like the server's own stats. 200 players with one game
+each on a 3 X 3 board, turn again, limit 3 and 4 workers: p50 0.5 s, p99 1.2 to 1.5 s, 320 to 390 moves a second and
+no errors (almost all of it is waiting for a worker, 10 players get p50 0.03 s).
+asyncio is imported by the functions that use it, so importing this file only loads the engine.
+"""
+
+SERVER_PORT = 8765
+
+
+# the value at fraction (0.5, 0.99) of the values, nearest rank
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def latency_summary(latencies):
+    return dict(moves=len(latencies), p50=percentile(latencies, 0.5), p99=percentile(latencies, 0.99),
+                max=max(latencies, default=None), mean=sum(latencies) / len(latencies) if latencies else None)
+
+
+# (move, seconds searched) of the bot, run in a worker process
+def _bot_move(arguments):
+    state, bot, max_player, turn_again, limit, time_budget = arguments
+    max_eval, min_eval = EVALUATE_FUNCTIONS[bot]
+    start = time.perf_counter()
+    value, action = search_move(state, max_eval, min_eval, max_player, turn_again, limit, time_budget=time_budget)
+    return action, time.perf_counter() - start
+
+
+class GameSession:
+
+    def __init__(self, number, size_of_game, turn_again, bot, human_max, limit, clock, increment):
+        self.number = number
+        self.size = size_of_game
+        self.turn_again = turn_again
+        self.bot = bot
+        self.human_max = human_max
+        self.limit = limit
+        self.increment = increment
+        self.clocks = {True: clock, False: clock}  # seconds left for max and min, None without a clock
+        self.state = make_bit_rep(size_of_game)
+        self.max_turn = turn_again  # like play_game
+        self.result = None
+        self.bot_moves = []  # since the last answer
+        self.turn_started = time.perf_counter()
+
+    def human_to_move(self):
+        return self.result is None and self.max_turn == self.human_max
+
+    def play(self, move):
+        self.state = bit_successor(self.state, move, self.max_turn, self.turn_again)
+        self.max_turn = not self.max_turn
+        while self.turn_again and self.state.again and utility(self.state) is None:
+            # the player to move only hands the turn back
+            self.state = bit_successor(self.state, move, self.max_turn, self.turn_again)
+            self.max_turn = not self.max_turn
+        u = utility(self.state)
+        if u is not None:
+            self.result = {1: "max", -1: "min", 0: "tie"}[u]
+
+    # take seconds off the clock of the player who moved, True if it ran out
+    def charge(self, max_player, seconds):
+        if self.clocks[max_player] is None:
+            return False
+        self.clocks[max_player] -= seconds
+        if self.clocks[max_player] < 0:
+            self.result = "min" if max_player else "max"
+            return True
+        self.clocks[max_player] += self.increment
+        return False
+
+    def answer(self):
+        bot_moves = self.bot_moves
+        self.bot_moves = []
+        legal = [] if self.result is not None else bit_actions_in(self.state)
+        drawn = [move for move in board_geometry(self.size).moves if self.state.drawn >> move & 1]
+        return dict(session=self.number, size=self.size, turn_again=self.turn_again,
+                    human="max" if self.human_max else "min", drawn=drawn,
+                    max_score=self.state.max_boxes.bit_count(), min_score=self.state.min_boxes.bit_count(),
+                    to_move=None if self.result is not None else ("max" if self.max_turn else "min"), legal=legal,
+                    bot_moves=bot_moves, clock=dict(max=self.clocks[True], min=self.clocks[False]),
+                    result=self.result)
+
+
+class GameServer:
+
+    def __init__(self, workers=None):
+        self.workers = workers
+        self.pool = None
+        self.sessions = dict()
+        self.next_session = 1
+        self.latencies = []  # seconds to answer each move request, bot moves included
+        self.connections = {}  # task handling each open connection -> its writer
+
+    async def start(self, host="127.0.0.1", port=SERVER_PORT):
+        import asyncio
+        from concurrent.futures import ProcessPoolExecutor
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.pool, int)  # start the workers before the first game
+        self.server = await asyncio.start_server(self.handle, host, port, backlog=1024)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        import asyncio
+        self.server.close()
+        # closing the writers hands every reader an end of file, so the handlers finish on their own
+        for writer in self.connections.values():
+            writer.close()
+        await asyncio.gather(*self.connections, return_exceptions=True)
+        await self.server.wait_closed()
+        self.pool.shutdown()
+
+    async def bot_turns(self, session):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        while session.result is None and not session.human_to_move():
+            time_budget = None
+            if session.clocks[session.max_turn] is not None:
+                moves_left = max(1, number_of_actions(session.state) // 2)
+                time_budget = max(0.01, session.clocks[session.max_turn] / moves_left)
+            action, seconds = await loop.run_in_executor(
+                self.pool, _bot_move, (session.state, session.bot, session.max_turn, session.turn_again,
+                                       session.limit, time_budget))
+            if session.charge(session.max_turn, seconds):
+                break
+            session.bot_moves.append(action)
+            session.play(action)
+        session.turn_started = time.perf_counter()
+
+    async def request(self, message, owned):
+        command = message.get("cmd")
+        if command == "new":
+            bot = message.get("bot", "action")
+            if bot not in EVALUATE_FUNCTIONS:
+                return dict(error="unknown bot: " + str(bot))
+            # everything is checked before the session exists, so a bad request leaves nothing behind
+            # (JSON true is not a number here and "false" is not false)
+            size_of_game = message.get("size", 3)
+            if type(size_of_game) is not int or not 1 <= size_of_game <= 10:
+                return dict(error="size must be an integer between 1 and 10")
+            turn_again = message.get("turn_again", True)
+            if type(turn_again) is not bool:
+                return dict(error="turn_again must be true or false")
+            human = message.get("human", "min")
+            if human not in ("max", "min"):
+                return dict(error="human must be max or min")
+            limit = message.get("limit", 3)
+            if type(limit) is not int or limit < 1:
+                return dict(error="limit must be an integer of at least 1")
+            clock = message.get("clock")
+            if clock is not None and (type(clock) not in (int, float) or not clock > 0):
+                return dict(error="clock must be more than 0 seconds")
+            increment = message.get("increment", 0)
+            if type(increment) not in (int, float) or not increment >= 0:
+                return dict(error="increment must be 0 or more seconds")
+            session = GameSession(self.next_session, size_of_game, turn_again, bot, human == "max", limit,
+                                  None if clock is None else float(clock), float(increment))
+            self.next_session += 1
+            self.sessions[session.number] = session
+            owned.add(session.number)
+            await self.bot_turns(session)
+            return session.answer()
+        if command == "stats":
+            return dict(latency_summary(self.latencies), sessions=len(self.sessions))
+
+        session = self.sessions.get(message.get("session"))
+        if session is None or session.number not in owned:
+            return dict(error="no such session")
+        if command == "state":
+            return session.answer()
+        if command == "resign":
+            if session.result is None:
+                session.result = "min" if session.human_max else "max"
+            return session.answer()
+        if command == "move":
+            if not session.human_to_move():
+                return dict(error="not your move")
+            move = message.get("move")
+            # JSON true and 1.0 compare equal to 1, so only a real int can be a move
+            if type(move) is not int or move not in bit_actions_in(session.state):
+                return dict(error="illegal move: " + json.dumps(move))
+            start = time.perf_counter()
+            if not session.charge(session.human_max, start - session.turn_started):
+                session.play(move)
+                await self.bot_turns(session)
+            self.latencies.append(time.perf_counter() - start)
+            return session.answer()
+        return dict(error="unknown command: " + str(command))
+
+    async def handle(self, reader, writer):
+        import asyncio
+        owned = set()  # sessions of this connection
+        self.connections[asyncio.current_task()] = writer
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                    if type(message) is not dict:
+                        raise ValueError("not a JSON object")
+                    answer = await self.request(message, owned)
+                except (ValueError, TypeError) as error:
+                    answer = dict(error=str(error))
+                writer.write(json.dumps(answer).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for number in owned:
+                del self.sessions[number]
+            self.connections.pop(asyncio.current_task(), None)
+            writer.close()
+
+
+async def serve(host="127.0.0.1", port=SERVER_PORT, workers=None):
+    server = GameServer(workers)
+    port = await server.start(host, port)
+    print("serving on %s:%d" % (host, port), file=sys.stderr)
+    async with server.server:
+        await server.server.serve_forever()
+
+
+# one load test player: games against the bot with random moves, the latency of every move request goes to latencies
+async def _load_test_player(host, port, number, games, settings, seed, latencies, errors):
+    import asyncio
+    rng = game_random(seed, number)
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        errors.append("connect")
+        return
+    try:
+        for game in range(games):
+            message = dict(settings, cmd="new", human="max" if (number + game) % 2 else "min")
+            writer.write(json.dumps(message).encode() + b"\n")
+            await writer.drain()
+            answer = json.loads(await reader.readline())
+            while "error" not in answer and answer["result"] is None:
+                writer.write(json.dumps(dict(cmd="move", session=answer["session"],
+                                             move=rng.choice(answer["legal"]))).encode() + b"\n")
+                start = time.perf_counter()
+                await writer.drain()
+                answer = json.loads(await reader.readline())
+                latencies.append(time.perf_counter() - start)
+            if "error" in answer:
+                errors.append(answer["error"])
+    except (ConnectionError, ValueError) as error:
+        errors.append(str(error))
+    finally:
+        writer.close()
+
+
+# players concurrent random players, games each, against a server at host:port (port None starts one here)
+async def load_test(players=200, games=1, host="127.0.0.1", port=None, workers=None, seed=0, **settings):
+    import asyncio
+    server = None
+    if port is None:
+        server = GameServer(workers)
+        port = await server.start(host, 0)
+    latencies = []
+    errors = []
+    start = time.perf_counter()
+    await asyncio.gather(*[_load_test_player(host, port, number, games, settings, seed, latencies, errors)
+                           for number in range(players)])
+    seconds = time.perf_counter() - start
+    if server is not None:
+        await server.close()
+    return dict(latency_summary(latencies), players=players, games=players * games, seconds=seconds,
+                moves_per_second=len(latencies) / seconds if seconds else None, errors=len(errors),
+                error_messages=sorted(set(errors))[:10])
+
+
+"""
+Benchmarks
+run_benchmarks times successors, evaluate functions and the search for every size and both rules, as a flat dict of
+name: number that save_benchmarks/load_benchmarks keep as JSON and compare_benchmarks checks against a baseline.
+"""
+
+
+# (state, max to move) for the start of the game and after 1/4, 1/2 and 3/4 of the lines of seeded random games
+def benchmark_positions(size_of_game, turn_again, seed=0):
+    positions = [(make_list_rep(size_of_game), turn_again)]
+    lines = len(board_geometry(size_of_game).moves)
+    for part in (1, 2, 3):
+        env = make_list_rep(size_of_game)
+        max_turn = turn_again
+        for action in random_opening(size_of_game, turn_again, lines * part // 4, game_random(seed, part)):
+            if max_turn:
+                env = max_successor_A(env, action) if turn_again else max_successor(env, action)
+            else:
+                env = min_successor_A(env, action) if turn_again else min_successor(env, action)
+            max_turn = not max_turn
+        positions.append((env, max_turn))
+    return positions
+
+
+# calls per second of function over argument lists, the best of rounds runs of at least min_seconds / rounds each
+# (the best run is the one the rest of the machine got in the way of the least)
+def calls_per_second(function, arguments, min_seconds, rounds=3):
+    best = 0
+    collecting = gc.isenabled()
+    gc.disable()  # like timeit, a collection landing in one run says nothing about the code being timed
+    try:
+        for round_number in range(rounds):
+            calls = 0
+            start = time.perf_counter()
+            while True:
+                for argument in arguments:
+                    function(*argument)
+                calls += len(arguments)
+                elapsed = time.perf_counter() - start
+                if elapsed >= min_seconds / rounds:
+                    break
+            best = max(best, calls / elapsed)
+    finally:
+        if collecting:
+            gc.enable()
+    return best
+
+
+# every rate is the best of a few runs on the same boards (benchmark_positions), a size stops going deeper once one
+# move takes longer than max_move_seconds. "in_place" searches a SearchState, "list input" the list representation
+# (the difference is turning it into a SearchState), node counts come from the same search without a table
+def run_benchmarks(sizes=range(2, 8), depths=range(1, 6), max_eval=action_evaluate_max, min_eval=action_evaluate_min,
+                   min_seconds=0.2, max_move_seconds=1.0, seed=0, output=None):
+    results = dict()
+    for size_of_game in sizes:
+        for turn_again in (False, True):
+            name = "%dx%d %s " % (size_of_game, size_of_game, "turn_again" if turn_again else "classic")
+            positions = benchmark_positions(size_of_game, turn_again, seed)
+
+            successors = (max_successor_A, min_successor_A) if turn_again else (max_successor, min_successor)
+            for successor in successors:
+                arguments = [(env, move) for env, max_turn in positions for move in actions_in(env)]
+                results[name + successor.__name__ + " calls/s"] = calls_per_second(successor, arguments, min_seconds)
+            for evaluate in (snatch_evaluate_max, action_evaluate_max, set_up_evaluate_max):
+                arguments = [(env,) for env, max_turn in positions]
+                results[name + evaluate.__name__ + " calls/s"] = calls_per_second(evaluate, arguments, min_seconds)
+
+            for depth in depths:
+                nodes = 0
+                for env, max_turn in positions:
+                    context = SearchContext(symmetry=False, ordering=False, batch=False)
+                    search_move(env, max_eval, min_eval, max_turn, turn_again, depth, context)
+                    nodes += context.nodes
+                seconds_per_move = dict()
+                arguments = [(as_search_state(env, max_turn, turn_again, copy=True), max_eval, min_eval, max_turn,
+                              turn_again, depth) for env, max_turn in positions]
+                seconds_per_move["in_place"] = 1 / calls_per_second(search_move, arguments, min_seconds)
+                arguments = [(env, max_eval, min_eval, max_turn, turn_again, depth) for env, max_turn in positions]
+                seconds_per_move["list input"] = 1 / calls_per_second(search_move, arguments, min_seconds)
+                for engine in ("in_place", "list input"):
+                    results[name + "depth %d %s nodes/s" % (depth, engine)] = nodes / len(positions) / seconds_per_move[engine]
+                    results[name + "depth %d %s s/move" % (depth, engine)] = seconds_per_move[engine]
+                if output is not None:
+                    print(name + "depth %d: %d nodes, %.4f s/move" % (depth, nodes, seconds_per_move["list input"]),
+                          file=output)
+                if seconds_per_move["list input"] > max_move_seconds:
+                    break
+    return results
+
+
+def save_benchmarks(results, file_name):
+    with open(file_name, "w") as stream:
+        json.dump(dict(python=platform.python_version(), machine=platform.machine(), results=results), stream,
+                  indent=1, sort_keys=True)
+
+
+def load_benchmarks(file_name):
+    with open(file_name) as stream:
+        return json.load(stream)["results"]
+
+
+# [(name, baseline, current, change)] of every number at least threshold worse than the baseline
+# change is the fraction it got worse by, numbers only in one of the two runs are skipped
+# the smallest boards can differ by 20% or more on a busy machine, compare runs of the same machine
+def compare_benchmarks(baseline, results, threshold=0.25):
+    regressions = []
+    for name in sorted(results):
+        if name not in baseline or not baseline[name] or not results[name]:
+            continue
+        if name.endswith("/s"):
+            change = baseline[name] / results[name] - 1  # rates, higher is better
+        else:
+            change = results[name] / baseline[name] - 1  # times, lower is better
+        if change > threshold:
+            regressions.append((name, baseline[name], results[name], change))
+    return regressions
+
+
+""" 
+After running experiment we have found that turn again mechanic does not influence the evaluate matchup outcome.
+The better evaluate function dominates whether the mathcup whether the mechanic is present or not.
+"""
+
+
+
+#My System: 1 minute and 30 seconds to run.
+
+#snatch_evaluate_min/max
+#action_evaluate_min/max
+#set_up_evaluate_min/max
+
+"""
+Command Line
+main runs the experiment with no arguments, or one command (simulate, sweep, play, bench, graph, tablebase, book, log,
+tournament, serve, loadtest), python SamuelM_Minimax_DotsBoxes_MLAI.py --help lists them.
+"""
+
+# evaluate name: (max version, min version)
+EVALUATE_FUNCTIONS = {"snatch": (snatch_evaluate_max, snatch_evaluate_min),
+                      "action": (action_evaluate_max, action_evaluate_min),
+                      "set_up": (set_up_evaluate_max, set_up_evaluate_min)}
+
+# the matchups of the experiment: max evaluate, min evaluate, title, x-labels of the graph
+EXPERIMENT = (("snatch", "action", "Action vs. Snatch", ["Ties", "Snatch Wins", "Action Wins "]),
+              ("set_up", "action", "Set Up vs. Action", ["Ties", "Set up Wins", "Action Wins"]),
+              ("snatch", "set_up", "Snatch vs. Set Up", ["Ties", "Snatch Evaluate", "Set up Evaluate"]))
+
+# names simulate and play take for each side
+PLAYERS = sorted(EVALUATE_FUNCTIONS) + ["mcts"]
+
+RESULT_FIELDS = ["title", "max_eval", "min_eval", "turn_again", "size", "games", "ties", "max_wins", "min_wins",
+                 "labels"]
+
+
+# matplotlib.pyplot, with a backend that needs no display when the graphs only go to files
+# the only place matplotlib gets imported, so simulate and sweep (rows as JSON or CSV) never load it
+def pyplot(headless=False):
+    import matplotlib
+    if headless:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+#This helper function will graph using the metplotlib.pyplot
+#with a file_name the graph is saved to that file instead of shown
+def make_graph(plot,string_title,x_label, y_label, bar_0, bar_1, file_name=None):
+    plot.bar(bar_0,bar_1)
+    plot.title(string_title)
+    plot.xlabel(x_label)
+    plot.ylabel(y_label)
+    if file_name is None:
+        plot.show()
+    else:
+        plot.savefig(file_name)
+        plot.close()
+
+
+# one results row for a matchup and its record [ties, max wins, min wins]
+def result_row(title, max_name, min_name, turn_again, size_of_game, games_played, record, labels=None):
+    if labels is None:
+        labels = ["Ties", max_name + " Wins", min_name + " Wins"]
+    return dict(title=title, max_eval=max_name, min_eval=min_name, turn_again=turn_again, size=size_of_game,
+                games=games_played, ties=record[0], max_wins=record[1], min_wins=record[-1], labels=labels)
+
+
+def write_rows(rows, output=None, output_format=None):
+    if output_format is None:
+        output_format = "csv" if output is not None and output.endswith(".csv") else "json"
+    stream = sys.stdout if output is None else open(output, "w", newline="")
+    try:
+        if output_format == "csv":
+            writer = csv.DictWriter(stream, RESULT_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(dict(row, labels="|".join(row["labels"])))
+        else:
+            json.dump(rows, stream, indent=1)
+            stream.write("\n")
+    finally:
+        if output is not None:
+            stream.close()
+
+
+def read_rows(file_name):
+    if file_name.endswith(".csv"):
+        with open(file_name, newline="") as stream:
+            rows = list(csv.DictReader(stream))
+        for row in rows:
+            row["labels"] = row["labels"].split("|")
+            row["turn_again"] = row["turn_again"] == "True"
+            for field in ("size", "games", "ties", "max_wins", "min_wins"):
+                row[field] = int(row[field])
+        return rows
+    with open(file_name) as stream:
+        return json.load(stream)
+
+
+# one graph per row, shown one after another, or saved as directory/<number>_<title>.png
+def graph_rows(rows, directory=None, headless=False):
+    plt = pyplot(headless)
+    if directory is not None:
+        os.makedirs(directory, exist_ok=True)
+    for number, row in enumerate(rows):
+        file_name = None
+        if directory is not None:
+            name = "".join(letter if letter.isalnum() else "_" for letter in row["title"])
+            file_name = os.path.join(directory, "%d_%s.png" % (number + 1, name))
+        make_graph(plt, row["title"], "Evaluate Function", "Total Wins", row["labels"],
+                   [row["ties"], row["max_wins"], row["min_wins"]], file_name)
+
+
+# argparse types for the budgets, which can be 0 but not negative
+def non_negative_int(text):
+    value = int(text)
+    if value < 0:
+        raise ValueError(text)
+    return value
+
+
+def non_negative_float(text):
+    value = float(text)
+    if not value >= 0:
+        raise ValueError(text)
+    return value
+
+
+def add_game_arguments(parser):
+    parser.add_argument("--size", type=int, default=3, help="boxes on each side of the board")
+    parser.add_argument("--games", type=int, default=50, help="games per matchup")
+    parser.add_argument("--engine", choices=("list", "bit", "in_place"), default="list")
+    parser.add_argument("--limit", type=int, default=3, help="search depth of every move")
+    parser.add_argument("--time-budget", type=non_negative_float, help="seconds per move (iterative deepening)")
+    parser.add_argument("--node-budget", type=non_negative_int, help="nodes per move (iterative deepening)")
+    parser.add_argument("--table", action="store_true", help="search with a transposition table")
+    parser.add_argument("--workers", type=int, default=1, help="processes to run the games on")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--random-openings", type=int, default=0, help="random turns at the start of every game")
+    parser.add_argument("--stats", action="store_true", help="add search stats (SearchStats.summary) to the JSON rows")
+    parser.add_argument("--tablebase", help="tablebase file for the endgames of turn again games (see tablebase)")
+    parser.add_argument("--endgame", action="store_true", help="play turn again chain and loop endgames exactly")
+    parser.add_argument("--book", help="opening book file for the first moves (see book)")
+    parser.add_argument("--log", help="add every game to this game log (.jsonl, else binary)")
+    parser.add_argument("--eval-cache", type=int, default=0, help="cache this many leaf evaluations (0: no cache)")
+
+
+def add_mcts_arguments(parser):
+    parser.add_argument("--mcts-iterations", type=int, default=MCTS_ITERATIONS, help="iterations per mcts move")
+    parser.add_argument("--mcts-seconds", type=float, help="seconds per mcts move instead of iterations")
+
+
+def add_output_arguments(parser):
+    parser.add_argument("--output", help="results file (default: standard output)")
+    parser.add_argument("--format", choices=("json", "csv"), help="default: from --output, else json")
+    parser.add_argument("--plot-dir", help="also save the graphs into this directory")
+
+
+# evaluate function, or MCTSPlayer, of one side from its command line name
+def player_of(options, name, max_player):
+    if name == "mcts":
+        return MCTSPlayer(options.mcts_iterations, options.mcts_seconds, seed=options.seed)
+    return EVALUATE_FUNCTIONS[name][0 if max_player else 1]
+
+
+# play_games arguments of one matchup from the command line options
+def matchup_arguments(options, max_name, min_name, turn_again):
+    context = None
+    if options.table or options.stats or options.tablebase or options.endgame or options.book \
+            or options.eval_cache or options.engine == "in_place":
+        context = SearchContext(TranspositionTable() if options.table else None, stats=options.stats,
+                                tablebase=Tablebase(options.tablebase) if options.tablebase else None,
+                                endgame=options.endgame, book=OpeningBook(options.book) if options.book else None,
+                                eval_cache=EvaluationCache(options.eval_cache) if options.eval_cache else None)
+    return dict(games_played=options.games, size_of_game=options.size, max_eval=player_of(options, max_name, True),
+                min_eval=player_of(options, min_name, False), turn_again=turn_again, engine=options.engine,
+                context=context, limit=options.limit, time_budget=options.time_budget,
+                node_budget=options.node_budget, seed=options.seed, random_openings=options.random_openings,
+                log=options.log)
+
+
+def run_matchups(options, pairings, show=False):
+    matchups = []
+    rows = []
+    for turn_again in (False, True):
+        for max_name, min_name, title, labels in pairings:
+            if turn_again not in options.rules:
+                continue
+            matchups.append(matchup_arguments(options, max_name, min_name, turn_again))
+            rows.append((("Turn Again: " if turn_again else "No Turn Again: ") + title, max_name, min_name,
+                         turn_again, labels))
+    records = simulate_matchups(matchups, options.workers)
+    rows = [result_row(title, max_name, min_name, turn_again, options.size, options.games, record, labels)
+            for (title, max_name, min_name, turn_again, labels), record in zip(rows, records)]
+    if options.stats:
+        for row, matchup in zip(rows, matchups):
+            row["stats"] = matchup["context"].stats.summary()
+            if matchup["context"].eval_cache is not None:
+                row["stats"]["eval_cache"] = matchup["context"].eval_cache.stats()
+    if show:
+        graph_rows(rows)
+        return rows
+    write_rows(rows, options.output, options.format)
+    if options.plot_dir is not None:
+        graph_rows(rows, options.plot_dir, headless=True)
+    return rows
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    parser = argparse.ArgumentParser(description="Minimax Dots and Boxes, with and without the turn again rule")
+    commands = parser.add_subparsers(dest="command")
+
+    simulate = commands.add_parser("simulate", help="play one matchup")
+    simulate.add_argument("max_eval", choices=PLAYERS)
+    simulate.add_argument("min_eval", choices=PLAYERS)
+    simulate.add_argument("--turn-again", action="store_true", help="a player that finishes a box goes again")
+    add_game_arguments(simulate)
+    add_mcts_arguments(simulate)
+    add_output_arguments(simulate)
+
+    sweep = commands.add_parser("sweep", help="play the matchups of the experiment, both rules")
+    add_game_arguments(sweep)
+    add_output_arguments(sweep)
+
+    play = commands.add_parser("play", help="play one game and print its moves")
+    play.add_argument("max_eval", choices=PLAYERS)
+    play.add_argument("min_eval", choices=PLAYERS)
+    play.add_argument("--turn-again", action="store_true")
+    play.add_argument("--size", type=int, default=3)
+    play.add_argument("--limit", type=int, default=3)
+    play.add_argument("--seed", type=int, default=0)
+    add_mcts_arguments(play)
+    play.add_argument("--show", action="store_true", help="draw the board after every move")
+
+    bench = commands.add_parser("bench", help="run the benchmarks (successors, evaluations, search)")
+    bench.add_argument("--sizes", type=int, nargs="+", default=list(range(2, 8)))
+    bench.add_argument("--depths", type=int, nargs="+", default=list(range(1, 6)))
+    bench.add_argument("--min-seconds", type=float, default=0.2, help="time each rate for at least this long")
+    bench.add_argument("--max-move-seconds", type=float, default=1.0, help="stop going deeper after a slower move")
+    bench.add_argument("--output", help="save the results as a JSON baseline")
+    bench.add_argument("--compare", help="baseline JSON to compare against, exits with 1 on a regression")
+    bench.add_argument("--threshold", type=float, default=0.25, help="allowed fraction worse than the baseline")
+
+    tournament = commands.add_parser("tournament", help="play a tournament, picking up a stopped one where it stopped")
+    tournament.add_argument("spec", nargs="?", help="JSON file of tournament settings (default TOURNAMENT_SPEC)")
+    tournament.add_argument("--checkpoint", required=True, help="finished units go here as they finish")
+    tournament.add_argument("--workers", type=int, default=1, help="processes to run the units on")
+    add_output_arguments(tournament)
+
+    log = commands.add_parser("log", help="totals of a game log: record, moves, capture runs")
+    log.add_argument("log")
+
+    graph = commands.add_parser("graph", help="draw the graphs of a simulate or sweep results file")
+    graph.add_argument("results")
+    graph.add_argument("--plot-dir", help="save the graphs here instead of showing them")
+
+    tablebase = commands.add_parser("tablebase", help="build an endgame tablebase for the turn again rules")
+    tablebase.add_argument("output")
+    tablebase.add_argument("--size", type=int, default=3)
+    tablebase.add_argument("--coverage", type=int, default=10, help="most lines left covered")
+
+    serve_command = commands.add_parser("serve", help="host games against the bots, one JSON object per line")
+    serve_command.add_argument("--host", default="127.0.0.1")
+    serve_command.add_argument("--port", type=int, default=SERVER_PORT)
+    serve_command.add_argument("--workers", type=int, help="processes the bots search on (default all cores)")
+
+    loadtest = commands.add_parser("loadtest", help="concurrent random players against a server, move latency")
+    loadtest.add_argument("--players", type=int, default=200)
+    loadtest.add_argument("--games", type=int, default=1, help="games each player plays")
+    loadtest.add_argument("--size", type=int, default=3)
+    loadtest.add_argument("--turn-again", action="store_true")
+    loadtest.add_argument("--bot", choices=sorted(EVALUATE_FUNCTIONS), default="action")
+    loadtest.add_argument("--limit", type=int, default=3)
+    loadtest.add_argument("--clock", type=float, help="seconds for each side")
+    loadtest.add_argument("--host", default="127.0.0.1")
+    loadtest.add_argument("--port", type=int, help="server to test (default starts one in this process)")
+    loadtest.add_argument("--workers", type=int, help="processes of the server started here")
+    loadtest.add_argument("--seed", type=int, default=0)
+
+    book = commands.add_parser("book", help="build an opening book for one size and rule")
+    book.add_argument("output")
+    book.add_argument("--size", type=int, default=3)
+    book.add_argument("--turn-again", action="store_true")
+    book.add_argument("--plies", type=int, default=2, help="first moves of the game in the book")
+    book.add_argument("--limit", type=int, default=5, help="search depth of every book position")
+    book.add_argument("--max-eval", choices=sorted(EVALUATE_FUNCTIONS), default="action")
+    book.add_argument("--min-eval", choices=sorted(EVALUATE_FUNCTIONS), default="action")
+    book.add_argument("--workers", type=int, default=1, help="processes to search the positions on")
+
+    if not argv:  # the original experiment, 50 games of each matchup on a 3 X 3 board, graphs on screen
+        options = sweep.parse_args([])
+        options.rules = (False, True)
+        options.workers = os.cpu_count()
+        run_matchups(options, EXPERIMENT, show=True)
+        return
+
+    options = parser.parse_args(argv)
+    if options.command == "simulate":
+        options.rules = (options.turn_again,)
+        run_matchups(options, [(options.max_eval, options.min_eval, options.max_eval + " vs. " + options.min_eval,
+                                None)])
+    elif options.command == "sweep":
+        options.rules = (False, True)
+        run_matchups(options, EXPERIMENT)
+    elif options.command == "play":
+        max_eval = player_of(options, options.max_eval, True)
+        min_eval = player_of(options, options.min_eval, False)
+        env = make_start_state(options.size, "bit", options.turn_again)
+        max_turn = options.turn_again
+        while utility(env) is None:
+            value, action = search_move(env, max_eval, min_eval, max_turn, options.turn_again, options.limit)
+            print(("max" if max_turn else "min"), action, value)
+            if max_turn:
+                env = max_successor_A(env, action) if options.turn_again else max_successor(env, action)
+            else:
+                env = min_successor_A(env, action) if options.turn_again else min_successor(env, action)
+            if options.show:
+                draw_DBQ(env)
+                print()
+            max_turn = not max_turn
+        print("utility", utility(env))
+    elif options.command == "bench":
+        results = run_benchmarks(options.sizes, options.depths, min_seconds=options.min_seconds,
+                                 max_move_seconds=options.max_move_seconds, output=sys.stderr)
+        for name in sorted(results):
+            print("%-60s %14.4f" % (name, results[name]))
+        if options.output is not None:
+            save_benchmarks(results, options.output)
+        if options.compare is not None:
+            regressions = compare_benchmarks(load_benchmarks(options.compare), results, options.threshold)
+            for name, baseline, current, change in regressions:
+                print("REGRESSION %s: %.6g -> %.6g (%.0f%% worse)" % (name, baseline, current, change * 100))
+            if regressions:
+                return 1
+    elif options.command == "tablebase":
+        build_tablebase(options.size, options.coverage, options.output)
+        print("%s: %d positions" % (options.output, tablebase_entries(options.size, options.coverage)))
+        mismatches = frontier_mismatches(options.size, tablebase=Tablebase(options.output))
+        print("batched and plain search disagree on %d of 300 positions" % mismatches)
+        if mismatches:
+            return 1
+    elif options.command == "book":
+        positions = build_opening_book(options.size, options.turn_again, options.plies, options.output,
+                                       EVALUATE_FUNCTIONS[options.max_eval][0],
+                                       EVALUATE_FUNCTIONS[options.min_eval][1], options.limit, options.workers)
+        print("%s: %d positions" % (options.output, positions))
+    elif options.command == "tournament":
+        spec = dict()
+        if options.spec is not None:
+            with open(options.spec) as stream:
+                spec = json.load(stream)
+        rows = run_tournament(spec, options.checkpoint, options.workers, output=sys.stderr)
+        write_rows(rows, options.output, options.format)
+        if options.plot_dir is not None:
+            graph_rows(rows, options.plot_dir, headless=True)
+    elif options.command == "serve":
+        import asyncio
+        asyncio.run(serve(options.host, options.port, options.workers))
+    elif options.command == "loadtest":
+        import asyncio
+        report = asyncio.run(load_test(options.players, options.games, options.host, options.port, options.workers,
+                                       options.seed, size=options.size, turn_again=options.turn_again,
+                                       bot=options.bot, limit=options.limit, clock=options.clock))
+        json.dump(report, sys.stdout, indent=1)
+        print()
+    elif options.command == "log":
+        json.dump(summarize_game_log(options.log), sys.stdout, indent=1)
+        print()
+    elif options.command == "graph":
+        graph_rows(read_rows(options.results), options.plot_dir, headless=options.plot_dir is not None)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+import random
+
+import pytest
+
+import SamuelM_Minimax_DotsBoxes_MLAI as game
+
+
+# every set of lines that leaves each box with 0 or 2 lines left (so only chains and loops), lines in move order
+def loony_line_sets(size):
+    geometry = game.board_geometry(size)
+    moves = list(geometry.moves)
+    last_line = dict()  # box -> position in moves of its last line
+    for number, move in enumerate(moves):
+        for box in geometry.edge_boxes[move]:
+            last_line[box] = number
+    box_free = [0] * geometry.boxes
+    free_lines = []
+    line_sets = []
+
+    def add_lines(number):
+        if number == len(moves):
+            line_sets.append(tuple(free_lines))
+            return
+        move = moves[number]
+        for free in (False, True):
+            if free:
+                free_lines.append(move)
+                for box in geometry.edge_boxes[move]:
+                    box_free[box] += 1
+            if all(box_free[box] in (0, 2) for box in geometry.edge_boxes[move] if last_line[box] == number) and \
+                    all(box_free[box] <= 2 for box in geometry.edge_boxes[move]):
+                add_lines(number + 1)
+            if free:
+                free_lines.pop()
+                for box in geometry.edge_boxes[move]:
+                    box_free[box] -= 1
+
+    add_lines(0)
+    return line_sets
+
+
+# turn again SearchState with only the free lines left, the finished boxes shared out at random
+def loony_state(size, free_lines, rng, max_to_move, again):
+    geometry = game.board_geometry(size)
+    drawn = 0
+    for move in geometry.moves:
+        if move not in free_lines:
+            drawn |= 1 << move
+    max_boxes = 0
+    min_boxes = 0
+    for box, edges in enumerate(geometry.box_edges):
+        if not any(move in free_lines for move in edges):
+            if rng.random() < 0.5:
+                max_boxes |= 1 << box
+            else:
+                min_boxes |= 1 << box
+    bit_state = game.BitState(size, drawn, max_boxes, min_boxes, again)
+    return game.SearchState.from_bit(bit_state, turn_again=True, max_to_move=max_to_move)
+
+
+# boxes max still wins over min with best play from both, by trying every line in every order
+def exhaustive_gain(state, known):
+    if state.free == 0:
+        return 0
+    key = (bytes(state.drawn), state.max_to_move, state.again)
+    if key not in known:
+        before = state.max_score - state.min_score
+        gains = []
+        for move in [-1] if state.again else state.actions():
+            state.apply(move)
+            gains.append(state.max_score - state.min_score - before + exhaustive_gain(state, known))
+            state.undo()
+        known[key] = max(gains) if state.max_to_move else min(gains)
+    return known[key]
+
+
+def sign(number):
+    return (number > 0) - (number < 0)
+
+
+def positions(size, count, seed):
+    rng = random.Random(seed)
+    line_sets = loony_line_sets(size)
+    if count < len(line_sets):
+        line_sets = rng.sample(line_sets, count)
+    return [loony_state(size, free_lines, rng, rng.random() < 0.5, rng.random() < 0.25)
+            for free_lines in line_sets if free_lines]
+
+
+@pytest.mark.parametrize("size, count", [(2, 200), (3, 300)])
+def test_loony_endgame_matches_exhaustive_search(size, count):
+    known = dict()
+    kinds = set()
+    for state in positions(size, count, seed=size):
+        chains, loops = game.loony_components(state)
+        kinds.update("chain of %d" % length if length < 3 else "longer chain" for length, lines in chains)
+        kinds.update("loop" for length, lines in loops)
+        chain_lengths = tuple(sorted(length for length, lines in chains))
+        loop_lengths = tuple(sorted(length for length, lines in loops))
+
+        gain = exhaustive_gain(state, known)
+        utility, move = game.loony_endgame(state)
+        assert utility == sign(state.max_score - state.min_score + gain), state.to_list()
+        if not state.again:
+            # the boxes the player who opens the next chain or loop ends up ahead by
+            assert game.loony_value(chain_lengths, loop_lengths) == (gain if state.max_to_move else -gain)
+
+        # the move keeps the best result
+        assert move in state.actions()
+        before = state.max_score - state.min_score
+        state.apply(move)
+        assert state.max_score - state.min_score - before + exhaustive_gain(state, known) == gain, state.to_list()
+        state.undo()
+    assert kinds == {"chain of 1", "chain of 2", "longer chain", "loop"}
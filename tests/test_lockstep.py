@@ -0,0 +1,62 @@
+import itertools
+import math
+import random
+
+import pytest
+
+import SamuelM_Minimax_DotsBoxes_MLAI as game
+
+pytest.importorskip("numpy")
+
+SIMULATIONS = {False: game.game_simulation_3, True: game.game_simulation_3A}
+
+
+@pytest.mark.parametrize("turn_again", [False, True])
+@pytest.mark.parametrize("size", [2, 3, 4])
+def test_evaluate_players_match_game_simulation(size, turn_again):
+    for max_name, min_name in itertools.product(game.EVALUATE_FUNCTIONS, repeat=2):
+        max_eval = game.EVALUATE_FUNCTIONS[max_name][0]
+        min_eval = game.EVALUATE_FUNCTIONS[min_name][1]
+        expected = SIMULATIONS[turn_again](4, size, max_eval, min_eval, limit=1)
+        assert game.lockstep_simulation(4, size, max_eval, min_eval, turn_again) == expected, (max_name, min_name)
+
+
+# one game the slow way, on the list representation, with the same players as lockstep_simulation
+def reference_game(size_of_game, max_eval, min_eval, turn_again, max_policy, min_policy, rng):
+    env = game.make_list_rep(size_of_game)
+    max_turn = turn_again
+    while game.utility(env) is None:
+        policy = max_policy if max_turn else min_policy
+        actions = game.actions_in(env)
+        if policy == "evaluate" and not game.handed_back(env):
+            action = game.search_move(env, max_eval, min_eval, max_turn, turn_again, limit=1)[1]
+        else:
+            if policy == "greedy":
+                actions = [action for action in actions if game.move_captures(env, action)] or actions
+            action = rng.choice(actions)
+        if max_turn:
+            env = game.max_successor_A(env, action) if turn_again else game.max_successor(env, action)
+        else:
+            env = game.min_successor_A(env, action) if turn_again else game.min_successor(env, action)
+        max_turn = not max_turn
+    return game.utility(env)
+
+
+@pytest.mark.parametrize("turn_again", [False, True])
+@pytest.mark.parametrize("max_policy, min_policy", [("random", "random"), ("greedy", "random"),
+                                                    ("random", "greedy"), ("greedy", "greedy"),
+                                                    ("evaluate", "random"), ("greedy", "evaluate")])
+def test_random_players_match_reference_games(max_policy, min_policy, turn_again):
+    games_played = 1000
+    max_eval, min_eval = game.EVALUATE_FUNCTIONS["action"]
+    rng = random.Random(1)
+    expected = [0, 0, 0]
+    for _ in range(games_played):
+        expected[reference_game(3, max_eval, min_eval, turn_again, max_policy, min_policy, rng)] += 1
+    record = game.lockstep_simulation(games_played, 3, max_eval, min_eval, turn_again, max_policy, min_policy, seed=1)
+    assert sum(record) == games_played
+    # the games are random, so the shares of ties and wins only have to agree within 4.5 standard errors
+    for lockstep_count, reference_count in zip(record, expected):
+        share = (lockstep_count + reference_count) / (2 * games_played)
+        error = math.sqrt(share * (1 - share) * 2 / games_played)
+        assert abs(lockstep_count - reference_count) / games_played <= 4.5 * error + 1e-9, (record, expected)
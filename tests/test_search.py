@@ -0,0 +1,93 @@
+import itertools
+import random
+from math import inf
+
+import pytest
+
+import SamuelM_Minimax_DotsBoxes_MLAI as game
+
+
+# the list search as it was before negamax, transposition tables, symmetry and PVS (values only)
+def baseline_value(state, max_eval, min_eval, alpha, beta, depth, limit, max_player, turn_again):
+    check_value = game.utility(state)
+    if check_value is not None:
+        return check_value
+    if depth == limit:
+        return max_eval(state) if max_player else min_eval(state)
+    if max_player:
+        successor = game.max_successor_A if turn_again else game.max_successor
+    else:
+        successor = game.min_successor_A if turn_again else game.min_successor
+    value = -inf if max_player else inf
+    for move in game.actions_in(state):
+        child = baseline_value(successor(state, move), max_eval, min_eval, alpha, beta, depth + 1, limit,
+                               not max_player, turn_again)
+        if max_player:
+            value = max(value, child)
+            alpha = max(alpha, child)
+        else:
+            value = min(value, child)
+            beta = min(beta, child)
+        if alpha >= beta:
+            break
+    return value
+
+
+def search(state, max_eval, min_eval, limit, max_player, turn_again, context=None):
+    if turn_again:
+        function = game.max_value_2A if max_player else game.min_value_2A
+    else:
+        function = game.max_value_2 if max_player else game.min_value_2
+    return function(state, max_eval, min_eval, -inf, inf, 0, limit, context)
+
+
+# seeded positions part way through random games, with the player to move (max moves first under turn again)
+def random_positions(size, turn_again, count, seed):
+    rng = random.Random(seed)
+    positions = []
+    for _ in range(count):
+        state = game.make_list_rep(size)
+        max_turn = turn_again
+        for _ in range(rng.randrange(len(game.actions_in(state)))):
+            move = rng.choice(game.actions_in(state))
+            if max_turn:
+                state = game.max_successor_A(state, move) if turn_again else game.max_successor(state, move)
+            else:
+                state = game.min_successor_A(state, move) if turn_again else game.min_successor(state, move)
+            max_turn = not max_turn
+        positions.append((state, max_turn))
+    return positions
+
+
+def contexts():
+    return {"default": lambda: None,
+            "table": lambda: game.SearchContext(table=game.TranspositionTable(), symmetry=False, pvs=False),
+            "symmetry": lambda: game.SearchContext(symmetry=True, pvs=False),
+            "pvs": lambda: game.SearchContext(symmetry=False, pvs=True),
+            "all": lambda: game.SearchContext(table=game.TranspositionTable(), symmetry=True, pvs=True)}
+
+
+@pytest.mark.parametrize("name", list(contexts()))
+@pytest.mark.parametrize("turn_again", [False, True])
+@pytest.mark.parametrize("size, limits", [(2, (1, 2, 3, 4)), (3, (1, 2, 3)), (4, (1, 2))])
+def test_search_values_match_baseline(name, turn_again, size, limits):
+    make_context = contexts()[name]
+    for max_name, min_name in itertools.product(game.EVALUATE_FUNCTIONS, repeat=2):
+        max_eval = game.EVALUATE_FUNCTIONS[max_name][0]
+        min_eval = game.EVALUATE_FUNCTIONS[min_name][1]
+        context = make_context()  # one table for the whole series, like the searches of a game
+        for state, max_player in random_positions(size, turn_again, 8, seed=size):
+            for limit in limits:
+                expected = baseline_value(state, max_eval, min_eval, -inf, inf, 0, limit, max_player, turn_again)
+                value, move = search(state, max_eval, min_eval, limit, max_player, turn_again, context)
+                # a rotated/mirrored board adds up the same boxes in another order, so only the last bits can differ
+                assert value == pytest.approx(expected, rel=1e-12, abs=1e-12), (max_name, min_name, state, limit)
+                # the move has to be worth the same value
+                if game.handed_back(state):
+                    continue
+                if max_player:
+                    child = game.max_successor_A(state, move) if turn_again else game.max_successor(state, move)
+                else:
+                    child = game.min_successor_A(state, move) if turn_again else game.min_successor(state, move)
+                child_value = baseline_value(child, max_eval, min_eval, -inf, inf, 1, limit, not max_player, turn_again)
+                assert child_value == pytest.approx(expected, rel=1e-12, abs=1e-12), (max_name, min_name, state, move)
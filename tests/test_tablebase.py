@@ -0,0 +1,49 @@
+import random
+
+import pytest
+
+import SamuelM_Minimax_DotsBoxes_MLAI as game
+
+pytest.importorskip("numpy")
+
+
+# utility with best play from here on, by trying every line in every order (positions are remembered)
+def exhaustive_utility(state, known):
+    utility = state.utility()
+    if utility is not None:
+        return utility
+    key = (bytes(state.drawn), state.max_to_move, state.again, state.max_score - state.min_score)
+    if key not in known:
+        values = []
+        for move in [-1] if state.again else state.actions():
+            state.apply(move)
+            values.append(exhaustive_utility(state, known))
+            state.undo()
+        known[key] = max(values) if state.max_to_move else min(values)
+    return known[key]
+
+
+# seeded random turn again positions with at most coverage lines left, either player to move
+def random_positions(size, coverage, count, seed):
+    rng = random.Random(seed)
+    positions = []
+    for _ in range(count):
+        state = game.SearchState(size, turn_again=True, max_to_move=rng.random() < 0.5)
+        left = rng.randint(0, coverage)
+        while state.free > left or (state.again and rng.random() < 0.5):
+            state.apply(-1 if state.again else rng.choice(state.actions()))
+        positions.append(state)
+    return positions
+
+
+@pytest.mark.parametrize("size, coverage, count", [(2, 12, 300), (3, 9, 200)])
+def test_tablebase_matches_exhaustive_search(tmp_path, size, coverage, count):
+    file_name = str(tmp_path / "tablebase.bin")
+    game.build_tablebase(size, coverage, file_name)
+    tablebase = game.Tablebase(file_name)
+    try:
+        known = dict()
+        for state in random_positions(size, coverage, count, seed=size):
+            assert tablebase.utility(state) == exhaustive_utility(state, known), state.to_list()
+    finally:
+        tablebase.close()